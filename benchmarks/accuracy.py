@@ -0,0 +1,44 @@
+# benchmarks/accuracy.py
+"""Item extraction accuracy against golden items"""
+from difflib import SequenceMatcher
+from typing import Dict, List
+
+# Names at least this similar (after casefolding) count as the same item
+NAME_SIMILARITY = 0.8
+
+
+def _similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, ' '.join(a.casefold().split()), ' '.join(b.casefold().split())).ratio()
+
+
+def match_items(extracted: List[Dict], expected: List[Dict]) -> Dict[str, int]:
+    """Count golden items found among the extracted ones
+
+    An expected item is matched by an unused extracted item with the same
+    price; 'exact' additionally requires a name at least NAME_SIMILARITY
+    alike. Returns the counts for score().
+    """
+    unused = list(extracted)
+    prices = exact = 0
+    for item in expected:
+        candidates = [other for other in unused if abs(other['price'] - item['price']) < 0.005]
+        if not candidates:
+            continue
+        best = max(candidates, key=lambda other: _similarity(other['dutch_name'], item['dutch_name']))
+        unused.remove(best)
+        prices += 1
+        exact += _similarity(best['dutch_name'], item['dutch_name']) >= NAME_SIMILARITY
+    return {'expected': len(expected), 'extracted': len(extracted), 'prices': prices, 'exact': exact}
+
+
+def score(counts: List[Dict[str, int]]) -> Dict[str, float]:
+    """Precision/recall/F1 over many receipts' match_items() counts"""
+    total = {key: sum(count[key] for count in counts) for key in ('expected', 'extracted', 'prices', 'exact')}
+    precision = total['exact'] / total['extracted'] if total['extracted'] else 0.0
+    recall = total['exact'] / total['expected'] if total['expected'] else 0.0
+    return {
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'price_recall': total['prices'] / total['expected'] if total['expected'] else 0.0,
+    }
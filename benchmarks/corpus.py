@@ -0,0 +1,120 @@
+# benchmarks/corpus.py
+"""Synthetic and sample receipt corpora for the benchmarks"""
+import glob
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from config.grocery_lexicon import GROCERY_LEXICON
+
+_NAMES = sorted(GROCERY_LEXICON)
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_receipt(rng: random.Random, items: int = 25) -> Tuple[str, List[Dict]]:
+    """OCR-like text of one receipt and the items printed on it
+
+    The text has a header, item lines in several layouts (quantity lines,
+    article numbers, bonus discounts) and totals; the expected items are
+    the products and discounts only, as golden 'dutch_name'/'price' dicts.
+    """
+    lines = ["ALBERT HEIJN", "Filiaal 1234", ""]
+    expected = []
+    total = 0.0
+    for _ in range(items):
+        name = rng.choice(_NAMES).upper()
+        price = rng.randint(19, 2999) / 100
+        total += price
+        style = rng.random()
+        if style < 0.15:
+            # Quantity line with the name on the line above
+            lines.append(name)
+            lines.append(f"2 x {price / 2:.2f}   {price:.2f}".replace('.', ','))
+            expected.append({'dutch_name': name, 'price': price})
+        elif style < 0.25:
+            lines.append(f"Art.nr. {rng.randint(10000000, 99999999)}")
+            lines.append(f"{name}   {price:.2f}".replace('.', ','))
+            expected.append({'dutch_name': name, 'price': price})
+        elif style < 0.3:
+            lines.append("")
+            lines.append(f"BONUS {name}   -{price / 4:.2f}")
+            expected.append({'dutch_name': f"BONUS {name}", 'price': -float(f"{price / 4:.2f}")})
+        else:
+            lines.append(f"{name}   {price:.2f}   B".replace('.', ','))
+            expected.append({'dutch_name': name, 'price': price})
+    lines += ["", f"TOTAAL   {total:.2f}", "PINNEN", f"{total:.2f}"]
+    return '\n'.join(lines), expected
+
+
+def synthetic_ocr_text(rng: random.Random, items: int = 25) -> str:
+    """OCR-like text of one receipt: header, item lines with noise, totals"""
+    return synthetic_receipt(rng, items)[0]
+
+
+def synthetic_texts(count: int, seed: int = 0) -> List[str]:
+    """A reproducible list of synthetic receipt texts"""
+    rng = random.Random(seed)
+    return [synthetic_ocr_text(rng, rng.randint(5, 60)) for _ in range(count)]
+
+
+def synthetic_receipts(count: int, seed: int = 0, max_items: int = 60) -> List[Tuple[str, List[Dict]]]:
+    """A reproducible list of (text, expected items) synthetic receipts"""
+    rng = random.Random(seed)
+    return [synthetic_receipt(rng, rng.randint(5, max_items)) for _ in range(count)]
+
+
+def render_receipt(text: str, rng: random.Random) -> bytes:
+    """Photograph-like JPEG of a receipt text: printed lines, a slight tilt, blur and noise"""
+    font, scale, thickness, line_height = cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2, 36
+    lines = text.split('\n')
+    width = max(cv2.getTextSize(line, font, scale, thickness)[0][0] for line in lines) + 80
+    page = np.full((len(lines) * line_height + 80, width), 255, dtype=np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(page, line, (40, 60 + i * line_height), font, scale, 0, thickness, cv2.LINE_AA)
+
+    # The paper on a darker table, tilted by a degree or two
+    height, width = page.shape
+    photo = np.full((height + 200, width + 200), 90, dtype=np.uint8)
+    photo[100:100 + height, 100:100 + width] = page
+    matrix = cv2.getRotationMatrix2D((photo.shape[1] / 2, photo.shape[0] / 2), rng.uniform(-2, 2), 1.0)
+    photo = cv2.warpAffine(photo, matrix, (photo.shape[1], photo.shape[0]), borderValue=90)
+    photo = cv2.GaussianBlur(photo, (3, 3), 0)
+    noise = np.random.default_rng(rng.randint(0, 2 ** 32 - 1)).normal(0, 8, photo.shape)
+    photo = np.clip(photo + noise, 0, 255).astype(np.uint8)
+
+    ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(photo, cv2.COLOR_GRAY2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def synthetic_images(count: int, seed: int = 0) -> List[Tuple[str, bytes, List[Dict]]]:
+    """A reproducible list of (name, JPEG bytes, expected items) rendered receipts"""
+    rng = random.Random(seed)
+    images = []
+    for index in range(count):
+        text, expected = synthetic_receipt(rng, rng.randint(5, 25))
+        images.append((f"synthetic-{index:03d}.jpg", render_receipt(text, rng), expected))
+    return images
+
+
+def sample_images(golden_dir: str = GOLDEN_DIR) -> List[Tuple[str, bytes, List[Dict]]]:
+    """The bundled receipt photos with their golden items
+
+    Each golden .json names its 'image' (relative to the repository root)
+    and lists the receipt's 'items' as 'dutch_name'/'price' dicts.
+    """
+    images = []
+    for path in sorted(glob.glob(os.path.join(golden_dir, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            golden = json.load(f)
+        image_path = os.path.join(REPO_ROOT, golden['image'])
+        if not os.path.exists(image_path):
+            continue
+        with open(image_path, 'rb') as f:
+            images.append((golden['image'], f.read(), golden['items']))
+    return images
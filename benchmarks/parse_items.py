@@ -0,0 +1,61 @@
+# benchmarks/parse_items.py
+"""
+Micro-benchmark for ImageProcessor's OCR text cleanup and item parser
+
+    python -m benchmarks.parse_items --receipts 2000
+    python -m benchmarks.parse_items --corpus ocr_texts/
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+from benchmarks.corpus import synthetic_texts
+from image_processor import ImageProcessor
+
+
+def load_texts(directory: str) -> List[str]:
+    """Read every .txt file of a directory (one OCR text per file)"""
+    texts = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.txt'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                texts.append(f.read())
+    return texts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.parse_items", description=__doc__)
+    parser.add_argument("--receipts", type=int, default=1000, help="synthetic receipts to generate")
+    parser.add_argument("--corpus", help="directory of OCR .txt files to use instead")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs; the best is reported")
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.corpus) if args.corpus else synthetic_texts(args.receipts)
+    line_count = sum(text.count('\n') + 1 for text in texts)
+    processor = ImageProcessor()
+
+    for label, run in (
+        ("clean", lambda: [processor._clean_text(text) for text in texts]),
+        ("parse", lambda: [processor.extract_items_from_text(text) for text in texts]),
+    ):
+        best = min(_timed(run) for _ in range(args.repeat))
+        print(
+            f"{label}: {len(texts)} texts, {line_count} lines in {best * 1000:.1f} ms "
+            f"- {len(texts) / best:,.0f} texts/sec, {line_count / best:,.0f} lines/sec"
+        )
+
+    item_count = sum(len(processor.extract_items_from_text(text)) for text in texts)
+    print(f"items: {item_count} ({item_count / len(texts):.1f} per receipt)")
+    return 0
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# benchmarks/suite.py
+"""
+Benchmark suite over synthetic and bundled sample receipts
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --images 50 --texts 2000 --profile quality
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --compare baseline.json    # exit 1 on a regression
+
+Stages: preprocess (decode + preprocessing profile), ocr (run_ocr + item
+extraction; skipped without Tesseract), parse (extract_items_from_text),
+translate (offline glossary backend, no network) and DatabaseManager
+ingestion and queries on a temporary database. Each reports latency,
+throughput and peak traced memory; ocr and parse also report item
+extraction accuracy against golden items.
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import metrics
+from benchmarks.accuracy import match_items, score
+from benchmarks.corpus import sample_images, synthetic_images, synthetic_receipts
+from config import settings
+from database import DatabaseManager
+from image_processor import ImageProcessor, available_profiles
+from pipeline import EXTRACTION_MODES, init_worker, process_image_bytes
+from translation_memory import TranslationMemory
+from translator import OfflineGlossaryBackend, TranslationService
+
+# Calls traced with tracemalloc for the memory peak (tracing slows Python code down)
+MEMORY_SAMPLES = 3
+
+
+def measure(calls: List[Callable], unit: str, units_per_call: Optional[List[int]] = None) -> Dict:
+    """Run the calls, returning their latencies, throughput (units/sec) and peak traced memory
+
+    Timings come from an untraced pass; a few calls are then re-run
+    under tracemalloc to find the largest per-call allocation peak.
+    """
+    latencies = []
+    results = []
+    for call in calls:
+        started = time.perf_counter()
+        results.append(call())
+        latencies.append(time.perf_counter() - started)
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for call in calls[:MEMORY_SAMPLES]:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            call()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    units = sum(units_per_call) if units_per_call else len(calls)
+    ordered = sorted(latencies)
+    return {
+        'count': len(calls),
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'per_sec': units / total if total else 0.0,
+        'unit': unit,
+        'peak_mb': peak / 2 ** 20,
+        'results': results,
+    }
+
+
+def bench_preprocess(images, profile: str) -> Dict:
+    processor = ImageProcessor()
+    profile = settings.PREPROCESS_AUTO_ORDER[0] if profile == 'auto' else profile
+    return measure([
+        lambda data=data: processor.preprocess_array(processor.decode_image(data), profile)
+        for _, data, _ in images
+    ], 'images')
+
+
+def bench_ocr(images, profile: str, extraction: str) -> Dict:
+    stage = measure([
+        lambda data=data: process_image_bytes(data, profile, extraction)['items']
+        for _, data, _ in images
+    ], 'images')
+    # Accuracy per corpus: the photos and the rendered receipts behave differently
+    for corpus in ('sample', 'synthetic'):
+        counts = [
+            match_items(items, expected)
+            for (name, _, expected), items in zip(images, stage['results'])
+            if name.startswith('synthetic-') == (corpus == 'synthetic')
+        ]
+        if counts:
+            stage[f'accuracy_{corpus}'] = score(counts)
+    return stage
+
+
+def bench_parse(receipts) -> Dict:
+    processor = ImageProcessor()
+    stage = measure(
+        [lambda text=text: processor.extract_items_from_text(text) for text, _ in receipts],
+        'lines', [text.count('\n') + 1 for text, _ in receipts],
+    )
+    stage['accuracy_synthetic'] = score([
+        match_items(items, expected) for (_, expected), items in zip(receipts, stage['results'])
+    ])
+    return stage
+
+
+def bench_translate(parsed: List[List[Dict]], workdir: str) -> Dict:
+    translator = TranslationService(
+        memory=TranslationMemory(os.path.join(workdir, 'memory.db')), backend=OfflineGlossaryBackend()
+    )
+    # translate_items fills english_name in place, so every call (and the traced re-runs) gets a copy
+    return measure(
+        [lambda items=items: translator.translate_items(copy.deepcopy(items)) for items in parsed],
+        'items', [len(items) for items in parsed],
+    )
+
+
+def bench_database(parsed: List[List[Dict]], receipt_count: int, workdir: str) -> Dict[str, Dict]:
+    rng = random.Random(0)
+    stores = ["Albert Heijn", "Jumbo", "Lidl", "IKEA"]
+    receipts = [{
+        'store_name': rng.choice(stores),
+        'date': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'items': parsed[index % len(parsed)],
+    } for index in range(receipt_count)]
+    batches = [receipts[start:start + 100] for start in range(0, len(receipts), 100)]
+
+    db = DatabaseManager(os.path.join(workdir, 'receipts.db'))
+    stages = {'db-ingest': measure([lambda batch=batch: db.save_receipts(batch) for batch in batches],
+                                   'receipts', [len(batch) for batch in batches])}
+
+    for label, query in (
+        ('db-page', lambda: db.get_receipts_page(limit=settings.VIEW_PAGE_SIZE)),
+        ('db-filter', lambda: db.get_filtered_receipts(store_name="Jumbo", date_from="2024-03-01")),
+        ('db-summary', db.get_expense_summary),
+        ('db-monthly', db.get_monthly_report),
+        ('db-scan', lambda: sum(1 for _ in db.iter_receipts_with_items())),
+    ):
+        stages[label] = measure([query] * 5, 'queries')
+    db.close()
+    return stages
+
+
+def ocr_available() -> Optional[str]:
+    """None when the OCR engine can be created, else the reason it cannot"""
+    try:
+        ImageProcessor().ocr_backend
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def print_report(stages: Dict[str, Dict]):
+    print(f"{'stage':<12} {'n':>5} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'peak MB':>9}   throughput")
+    for label, stage in stages.items():
+        print(
+            f"{label:<12} {stage['count']:>5} {stage['mean_ms']:>10.2f} {stage['p50_ms']:>10.2f} "
+            f"{stage['p95_ms']:>10.2f} {stage['peak_mb']:>9.2f}   {stage['per_sec']:,.1f} {stage['unit']}/sec"
+        )
+    for label, stage in stages.items():
+        for key, accuracy in stage.items():
+            if key.startswith('accuracy_'):
+                print(
+                    f"{label} accuracy ({key[9:]}): precision {accuracy['precision']:.3f}, "
+                    f"recall {accuracy['recall']:.3f}, F1 {accuracy['f1']:.3f}, "
+                    f"price recall {accuracy['price_recall']:.3f}"
+                )
+
+
+def compare(stages: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions against a saved run: slower means, or a lower F1"""
+    regressions = []
+    for label, stage in stages.items():
+        before = baseline.get(label)
+        if not before:
+            continue
+        if stage['mean_ms'] > before['mean_ms'] * (1 + tolerance):
+            regressions.append(f"{label}: mean {before['mean_ms']:.2f} -> {stage['mean_ms']:.2f} ms")
+        for key, accuracy in stage.items():
+            if key.startswith('accuracy_') and key in before and accuracy['f1'] < before[key]['f1'] - 0.01:
+                regressions.append(f"{label} {key}: F1 {before[key]['f1']:.3f} -> {accuracy['f1']:.3f}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=10, help="synthetic receipt images to render")
+    parser.add_argument("--no-samples", action="store_true", help="skip the bundled receipt photos")
+    parser.add_argument("--texts", type=int, default=1000, help="synthetic OCR texts to parse and translate")
+    parser.add_argument("--db-receipts", type=int, default=2000, help="receipts to ingest into the database")
+    parser.add_argument("--profile", choices=available_profiles(), default=settings.PREPROCESS_PROFILE)
+    parser.add_argument("--extraction", choices=EXTRACTION_MODES, default=settings.ITEM_EXTRACTION)
+    parser.add_argument("--skip-ocr", action="store_true", help="skip the OCR stage")
+    parser.add_argument("--save", help="write the results as JSON (a baseline for --compare)")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 when a stage regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed mean slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    images = ([] if args.no_samples else sample_images()) + synthetic_images(args.images)
+    receipts = synthetic_receipts(args.texts)
+    print(f"Corpus: {len(images)} images ({len(images) - args.images} samples), {len(receipts)} texts")
+
+    stages = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if images:
+            stages['preprocess'] = bench_preprocess(images, args.profile)
+
+        reason = "--skip-ocr" if args.skip_ocr else ocr_available()
+        if images and reason is None:
+            init_worker()
+            stages['ocr'] = bench_ocr(images, args.profile, args.extraction)
+        elif images:
+            print(f"Skipping OCR: {reason}")
+
+        stages['parse'] = bench_parse(receipts)
+        parsed = stages['parse']['results']
+        stages['translate'] = bench_translate(parsed, workdir)
+        stages.update(bench_database(parsed, args.db_receipts, workdir))
+
+    for stage in stages.values():
+        del stage['results']
+
+    print_report(stages)
+    print("Pipeline stages (metrics hooks, all runs):\n" + metrics.stage_summary())
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+        print(f"Peak RSS: {peak_rss:.0f} MB")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(stages, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(stages, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
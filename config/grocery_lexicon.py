@@ -0,0 +1,320 @@
+# Dutch -> English grocery lexicon used by the offline translation backend.
+# Keys are lowercase; multi-word entries take precedence over single words.
+GROCERY_LEXICON = {
+    # Dairy & eggs
+    'melk': 'milk',
+    'halfvolle melk': 'semi-skimmed milk',
+    'volle melk': 'whole milk',
+    'magere melk': 'skimmed milk',
+    'karnemelk': 'buttermilk',
+    'chocolademelk': 'chocolate milk',
+    'halfvolle': 'semi-skimmed',
+    'volle': 'whole',
+    'mager': 'low-fat',
+    'magere': 'skimmed',
+    'yoghurt': 'yogurt',
+    'griekse yoghurt': 'greek yogurt',
+    'vla': 'custard',
+    'kwark': 'quark',
+    'room': 'cream',
+    'slagroom': 'whipped cream',
+    'kookroom': 'cooking cream',
+    'zure room': 'sour cream',
+    'boter': 'butter',
+    'roomboter': 'butter',
+    'margarine': 'margarine',
+    'kaas': 'cheese',
+    'jonge kaas': 'young cheese',
+    'belegen kaas': 'mature cheese',
+    'oude kaas': 'old cheese',
+    'geitenkaas': 'goat cheese',
+    'smeerkaas': 'cheese spread',
+    'geraspte kaas': 'grated cheese',
+    'plakken': 'slices',
+    'eieren': 'eggs',
+    'ei': 'egg',
+    'scharreleieren': 'free-range eggs',
+    # Bakery
+    'brood': 'bread',
+    'volkoren': 'wholemeal',
+    'volkorenbrood': 'wholemeal bread',
+    'witbrood': 'white bread',
+    'bruinbrood': 'brown bread',
+    'meergranen': 'multigrain',
+    'stokbrood': 'baguette',
+    'broodjes': 'rolls',
+    'bolletjes': 'buns',
+    'croissants': 'croissants',
+    'beschuit': 'rusk',
+    'krentenbollen': 'currant buns',
+    'ontbijtkoek': 'gingerbread',
+    'tijgerbrood': 'tiger bread',
+    'pistolets': 'bread rolls',
+    'wraps': 'wraps',
+    'taart': 'cake',
+    'cake': 'cake',
+    'koekjes': 'cookies',
+    'koek': 'cake',
+    'stroopwafels': 'syrup waffles',
+    'beschuiten': 'rusks',
+    'crackers': 'crackers',
+    # Fruit
+    'fruit': 'fruit',
+    'appel': 'apple',
+    'appels': 'apples',
+    'peer': 'pear',
+    'peren': 'pears',
+    'banaan': 'banana',
+    'bananen': 'bananas',
+    'sinaasappel': 'orange',
+    'sinaasappels': 'oranges',
+    'mandarijnen': 'tangerines',
+    'citroen': 'lemon',
+    'citroenen': 'lemons',
+    'limoen': 'lime',
+    'druiven': 'grapes',
+    'aardbeien': 'strawberries',
+    'frambozen': 'raspberries',
+    'blauwe bessen': 'blueberries',
+    'bessen': 'berries',
+    'kersen': 'cherries',
+    'meloen': 'melon',
+    'watermeloen': 'watermelon',
+    'ananas': 'pineapple',
+    'mango': 'mango',
+    'kiwi': 'kiwi',
+    'pruimen': 'plums',
+    'perziken': 'peaches',
+    'avocado': 'avocado',
+    'rozijnen': 'raisins',
+    # Vegetables
+    'groente': 'vegetables',
+    'groenten': 'vegetables',
+    'aardappel': 'potato',
+    'aardappelen': 'potatoes',
+    'kruimige aardappelen': 'floury potatoes',
+    'vastkokende aardappelen': 'waxy potatoes',
+    'zoete aardappel': 'sweet potato',
+    'ui': 'onion',
+    'uien': 'onions',
+    'rode ui': 'red onion',
+    'knoflook': 'garlic',
+    'prei': 'leek',
+    'wortel': 'carrot',
+    'wortelen': 'carrots',
+    'worteltjes': 'baby carrots',
+    'tomaat': 'tomato',
+    'tomaten': 'tomatoes',
+    'trostomaten': 'vine tomatoes',
+    'cherrytomaten': 'cherry tomatoes',
+    'komkommer': 'cucumber',
+    'paprika': 'bell pepper',
+    'paprika\'s': 'bell peppers',
+    'sla': 'lettuce',
+    'ijsbergsla': 'iceberg lettuce',
+    'rucola': 'arugula',
+    'spinazie': 'spinach',
+    'andijvie': 'endive',
+    'witlof': 'chicory',
+    'boerenkool': 'kale',
+    'spruitjes': 'brussels sprouts',
+    'bloemkool': 'cauliflower',
+    'broccoli': 'broccoli',
+    'courgette': 'zucchini',
+    'aubergine': 'eggplant',
+    'champignons': 'mushrooms',
+    'paddenstoelen': 'mushrooms',
+    'bonen': 'beans',
+    'sperziebonen': 'green beans',
+    'doperwten': 'peas',
+    'erwten': 'peas',
+    'mais': 'corn',
+    'maïs': 'corn',
+    'rode kool': 'red cabbage',
+    'kool': 'cabbage',
+    'bieten': 'beets',
+    'selderij': 'celery',
+    'peterselie': 'parsley',
+    'basilicum': 'basil',
+    'koriander': 'coriander',
+    'gember': 'ginger',
+    'pompoen': 'pumpkin',
+    'salade': 'salad',
+    'soepgroente': 'soup vegetables',
+    'roerbakgroente': 'stir-fry vegetables',
+    'diepvries': 'frozen',
+    # Meat & fish
+    'vlees': 'meat',
+    'kip': 'chicken',
+    'kipfilet': 'chicken breast',
+    'kippendijen': 'chicken thighs',
+    'kippenpoten': 'chicken drumsticks',
+    'gehakt': 'minced meat',
+    'rundergehakt': 'minced beef',
+    'half om half': 'mixed mince',
+    'rundvlees': 'beef',
+    'biefstuk': 'steak',
+    'varkensvlees': 'pork',
+    'speklapjes': 'pork belly slices',
+    'spek': 'bacon',
+    'spekjes': 'bacon bits',
+    'ontbijtspek': 'breakfast bacon',
+    'ham': 'ham',
+    'rookworst': 'smoked sausage',
+    'worst': 'sausage',
+    'worstjes': 'sausages',
+    'saucijzen': 'sausages',
+    'salami': 'salami',
+    'kalkoen': 'turkey',
+    'lamsvlees': 'lamb',
+    'vis': 'fish',
+    'zalm': 'salmon',
+    'zalmfilet': 'salmon fillet',
+    'tonijn': 'tuna',
+    'kabeljauw': 'cod',
+    'garnalen': 'shrimp',
+    'haring': 'herring',
+    'makreel': 'mackerel',
+    'mosselen': 'mussels',
+    'vissticks': 'fish sticks',
+    'filet': 'fillet',
+    'vegetarisch': 'vegetarian',
+    'vega': 'vegetarian',
+    # Pantry
+    'rijst': 'rice',
+    'pasta': 'pasta',
+    'spaghetti': 'spaghetti',
+    'macaroni': 'macaroni',
+    'noedels': 'noodles',
+    'meel': 'flour',
+    'bloem': 'flour',
+    'suiker': 'sugar',
+    'zout': 'salt',
+    'peper': 'pepper',
+    'olie': 'oil',
+    'olijfolie': 'olive oil',
+    'zonnebloemolie': 'sunflower oil',
+    'azijn': 'vinegar',
+    'mayonaise': 'mayonnaise',
+    'mosterd': 'mustard',
+    'ketchup': 'ketchup',
+    'saus': 'sauce',
+    'tomatensaus': 'tomato sauce',
+    'pastasaus': 'pasta sauce',
+    'soep': 'soup',
+    'bouillon': 'broth',
+    'kruiden': 'herbs',
+    'specerijen': 'spices',
+    'pindakaas': 'peanut butter',
+    'jam': 'jam',
+    'hagelslag': 'chocolate sprinkles',
+    'honing': 'honey',
+    'stroop': 'syrup',
+    'chocolade': 'chocolate',
+    'chocoladepasta': 'chocolate spread',
+    'muesli': 'muesli',
+    'havermout': 'oatmeal',
+    'cornflakes': 'cornflakes',
+    'ontbijtgranen': 'breakfast cereal',
+    'noten': 'nuts',
+    'pinda\'s': 'peanuts',
+    'pindas': 'peanuts',
+    'chips': 'crisps',
+    'snoep': 'candy',
+    'drop': 'liquorice',
+    'blik': 'can',
+    'pot': 'jar',
+    'zak': 'bag',
+    'pak': 'pack',
+    'doos': 'box',
+    'fles': 'bottle',
+    'stuks': 'pieces',
+    'stuk': 'piece',
+    'kilo': 'kilo',
+    'gram': 'gram',
+    'liter': 'liter',
+    # Drinks
+    'water': 'water',
+    'bronwater': 'spring water',
+    'spa rood': 'sparkling water',
+    'koffie': 'coffee',
+    'koffiebonen': 'coffee beans',
+    'koffiepads': 'coffee pods',
+    'thee': 'tea',
+    'sap': 'juice',
+    'sinaasappelsap': 'orange juice',
+    'appelsap': 'apple juice',
+    'frisdrank': 'soft drink',
+    'cola': 'cola',
+    'limonade': 'lemonade',
+    'siroop': 'syrup',
+    'bier': 'beer',
+    'wijn': 'wine',
+    'rode wijn': 'red wine',
+    'witte wijn': 'white wine',
+    'alcoholvrij': 'alcohol-free',
+    'statiegeld': 'bottle deposit',
+    # Household & personal care
+    'wasmiddel': 'laundry detergent',
+    'afwasmiddel': 'dish soap',
+    'vaatwastabletten': 'dishwasher tablets',
+    'wasverzachter': 'fabric softener',
+    'schoonmaakmiddel': 'cleaning product',
+    'toiletpapier': 'toilet paper',
+    'wc papier': 'toilet paper',
+    'keukenpapier': 'kitchen paper',
+    'zakdoekjes': 'tissues',
+    'vuilniszakken': 'garbage bags',
+    'tandpasta': 'toothpaste',
+    'tandenborstel': 'toothbrush',
+    'shampoo': 'shampoo',
+    'douchegel': 'shower gel',
+    'zeep': 'soap',
+    'handzeep': 'hand soap',
+    'deodorant': 'deodorant',
+    'luiers': 'diapers',
+    'batterijen': 'batteries',
+    'tas': 'bag',
+    'draagtas': 'carrier bag',
+    'plastic tas': 'plastic bag',
+    # Receipt vocabulary
+    'totaal': 'total',
+    'subtotaal': 'subtotal',
+    'te betalen': 'to pay',
+    'betaald': 'paid',
+    'contant': 'cash',
+    'pinnen': 'card payment',
+    'wisselgeld': 'change',
+    'korting': 'discount',
+    'bonus': 'bonus',
+    'actie': 'promotion',
+    'btw': 'vat',
+    'aantal': 'quantity',
+    'prijs': 'price',
+    'bedrag': 'amount',
+    'biologisch': 'organic',
+    'bio': 'organic',
+    'vers': 'fresh',
+    'verse': 'fresh',
+    'gesneden': 'sliced',
+    'gerookt': 'smoked',
+    'gekookt': 'cooked',
+    'gebakken': 'baked',
+    'groot': 'large',
+    'grote': 'large',
+    'klein': 'small',
+    'kleine': 'small',
+    'rood': 'red',
+    'rode': 'red',
+    'wit': 'white',
+    'witte': 'white',
+    'zwart': 'black',
+    'groen': 'green',
+    'groene': 'green',
+    'geel': 'yellow',
+    'zoet': 'sweet',
+    'zonder': 'without',
+    'met': 'with',
+    'en': 'and',
+    'light': 'light',
+}
@@ -1,17 +1,36 @@
+import os
+
 # Application settings
 APP_NAME = "Receipt Processing App"
 APP_VERSION = "1.0.0"
 
 # Database settings
 DATABASE_NAME = "receipts.db"
+DB_JOURNAL_MODE = "WAL"
+DB_SYNCHRONOUS = "NORMAL"  # fsync at checkpoints only; safe with WAL
+DB_CACHE_SIZE_KB = 64 * 1024
+VIEW_PAGE_SIZE = 200  # rows fetched per scroll step in the View Data tab
 
 # OCR settings
 OCR_LANGUAGES = "nld+eng"
-TESSERACT_CONFIG = "--psm 6"
+TESSERACT_CONFIG = "--oem 3 --psm 6 -c preserve_interword_spaces=1"
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")  # auto (tesserocr if installed), tesserocr, pytesseract
+ITEM_EXTRACTION = os.getenv("ITEM_EXTRACTION", "text")  # text (regex over OCR text), words (word boxes)
+ITEM_REVIEW_CONFIDENCE = 80.0  # word-level items below this are flagged needs_review
+RECEIPT_REVIEW_CONFIDENCE = 60.0  # receipts with a lower mean word confidence always need review
 
 # Translation settings
 DEFAULT_SOURCE_LANG = "nl"
 DEFAULT_TARGET_LANG = "en"
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")  # google, offline
+TRANSLATION_LEXICON_PATH = os.getenv("TRANSLATION_LEXICON_PATH")  # optional JSON extending the offline lexicon
+TRANSLATION_FUZZY_CUTOFF = 0.85  # difflib ratio for offline fuzzy matches
+TRANSLATION_MEMORY_ENABLED = True
+TRANSLATION_MEMORY_DB = DATABASE_NAME  # translation_memory table lives next to receipts
+TRANSLATION_MEMORY_CACHE_SIZE = 4096  # in-process LRU entries
+TRANSLATION_BULK = True  # send all names of a receipt in one newline-joined request
+TRANSLATION_CONCURRENCY = 4  # parallel per-item requests when bulk is off or fails
+TRANSLATION_TIMEOUT = 5.0  # seconds per item request
 
 # Categories
 DEFAULT_CATEGORIES = [
@@ -20,5 +39,70 @@ DEFAULT_CATEGORIES = [
 ]
 
 # Image settings
-MAX_IMAGE_SIZE = (800, 1200)
-SUPPORTED_FORMATS = ["*.png", "*.jpg", "*.jpeg", "*.bmp", "*.tiff"]
\ No newline at end of file
+MAX_IMAGE_SIZE = (800, 1200)  # (width, height) fallback bound when the text size cannot be measured
+SUPPORTED_FORMATS = ["*.png", "*.jpg", "*.jpeg", "*.bmp", "*.tiff"]
+
+# Scale profiles: images are rescaled so their characters are about text_height
+# pixels tall before denoising, enlarging at most max_upscale times and never
+# exceeding max_pixels
+IMAGE_SCALE_PROFILES = {
+    'fast': {'text_height': 18, 'max_upscale': 1.0, 'max_pixels': 1_000_000},
+    'balanced': {'text_height': 24, 'max_upscale': 1.5, 'max_pixels': 2_000_000},
+    'quality': {'text_height': 32, 'max_upscale': 2.0, 'max_pixels': 6_000_000},
+}
+
+# Preprocessing profiles: fast (adaptive threshold only), balanced (denoise +
+# Otsu) and quality (denoise + deskew + Otsu), each with its scale profile.
+# "auto" tries them in PREPROCESS_AUTO_ORDER until Tesseract's mean word
+# confidence reaches PREPROCESS_AUTO_MIN_CONFIDENCE.
+PREPROCESS_PROFILE = os.getenv("PREPROCESS_PROFILE", "balanced")  # fast, balanced, quality, auto
+PREPROCESS_PROFILES = {
+    'fast': {'scale': 'fast', 'denoise': False, 'deskew': False, 'threshold': 'adaptive'},
+    'balanced': {'scale': 'balanced', 'denoise': True, 'deskew': False, 'threshold': 'otsu'},
+    'quality': {'scale': 'quality', 'denoise': True, 'deskew': True, 'threshold': 'otsu'},
+}
+PREPROCESS_AUTO_ORDER = ['fast', 'balanced', 'quality']
+PREPROCESS_AUTO_MIN_CONFIDENCE = 75.0  # 0-100
+DESKEW_MAX_ANGLE = 10  # degrees searched either way
+
+# Receipt boundary detection: crop (and flatten) the receipt out of the photo before OCR
+RECEIPT_DETECTION = os.getenv("RECEIPT_DETECTION", "1") == "1"
+RECEIPT_MIN_AREA = 0.2  # smallest accepted receipt, as a fraction of the photo
+
+# Strip OCR: tall images are cut at blank rows into up to OCR_STRIPS bands that
+# are recognized concurrently, one tesseract process each. Leave at 1 when
+# every core is already busy with other images (e.g. OCR_WORKERS = cpu count);
+# OMP_THREAD_LIMIT=1 stops the bands' tesseract threads competing.
+OCR_STRIPS = int(os.getenv("OCR_STRIPS", "1"))  # 1 disables
+OCR_STRIP_MIN_HEIGHT = 400  # preprocessed pixels per band, at least
+OCR_STRIP_OVERLAP = 40  # rows shared by neighbouring bands when a cut crosses text
+
+# Web API worker pool settings
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", "32"))
+OCR_RETRY_AFTER = 2  # seconds, sent with 503 when the pool is saturated
+STREAM_MAX_IMAGES = 20  # per /v1/extract-items/stream request
+
+# Warm-up: every OCR worker runs the full pipeline once on this bundled receipt
+# before the web app accepts requests, so no request pays the cold start
+WARMUP_IMAGE = os.getenv(
+    "WARMUP_IMAGE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 "WhatsApp Image 2025-09-04 at 03.03.16_48148d62.jpg"),
+)  # empty disables
+WARMUP_TIMEOUT = 120  # seconds the app waits for its workers to warm up
+
+# Batch jobs (/v1/jobs): images are queued in SQLite and drained by worker processes
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))  # per web worker; 0 leaves draining to `manage work-jobs`
+JOB_MAX_IMAGES = 200  # per job, zip members included
+JOB_MAX_BYTES = int(os.getenv("JOB_MAX_BYTES", str(100 * 1024 * 1024)))  # image bytes per job, zips unpacked
+JOB_MAX_ATTEMPTS = 3
+JOB_STALE_AFTER = 600  # seconds a claimed image may take before it is retried
+JOB_POLL_INTERVAL = 0.5  # seconds an idle worker waits between claims
+JOB_RETENTION = 7 * 24 * 3600  # seconds finished jobs are kept
+
+# OCR result cache (keyed on image bytes + OCR config)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))  # in-process LRU entries
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB")  # SQLite file for the on-disk tier; unset disables it
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
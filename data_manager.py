@@ -1,7 +1,16 @@
 
 # data_manager.py
+import csv
+import os
 import pandas as pd
-from typing import List, Dict, Tuple
+from itertools import islice
+from typing import Iterable, List, Dict, Tuple
+
+# Column layout of DatabaseManager receipt item rows
+RECEIPT_EXPORT_COLUMNS = ['Receipt ID', 'Store', 'Date', 'Row', 'Item', 'Price', 'Category']
+
+# Excel's hard limit per worksheet, header included
+EXCEL_MAX_ROWS = 1048576
 
 class DataManager:
     """Handles data operations and exports"""
@@ -25,13 +34,90 @@ class DataManager:
     def export_receipts_to_excel(receipts_data: List[Tuple], file_path: str):
         """Export receipts data to Excel"""
         try:
-            df = pd.DataFrame(receipts_data, 
-                            columns=['Receipt ID', 'Store', 'Date', 'Item', 'Price', 'Category'])
+            df = pd.DataFrame(receipts_data, columns=RECEIPT_EXPORT_COLUMNS)
             df.to_excel(file_path, index=False)
             return True
         except Exception as e:
             raise Exception(f"Error exporting receipts to Excel: {str(e)}")
     
+    @staticmethod
+    def export_receipts(rows: Iterable[Tuple], file_path: str) -> int:
+        """Stream receipt rows to .xlsx, .csv or .parquet (by extension); returns the row count"""
+        extension = os.path.splitext(file_path)[1].lower()
+        try:
+            if extension == '.csv':
+                return DataManager.stream_receipts_to_csv(rows, file_path)
+            if extension == '.parquet':
+                return DataManager.stream_receipts_to_parquet(rows, file_path)
+            return DataManager.stream_receipts_to_excel(rows, file_path)
+        except Exception as e:
+            raise Exception(f"Error exporting receipts: {str(e)}")
+    
+    @staticmethod
+    def stream_receipts_to_excel(rows: Iterable[Tuple], file_path: str) -> int:
+        """Write rows with an openpyxl write-only workbook (constant memory)"""
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        sheet = None
+        sheet_rows = EXCEL_MAX_ROWS
+        count = 0
+        
+        for row in rows:
+            # Continue on a new sheet once Excel's row limit is reached
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Receipts {len(workbook.worksheets) + 1}" if count else "Receipts")
+                sheet.append(RECEIPT_EXPORT_COLUMNS)
+                sheet_rows = 1
+            sheet.append(row)
+            sheet_rows += 1
+            count += 1
+        
+        if sheet is None:
+            workbook.create_sheet("Receipts").append(RECEIPT_EXPORT_COLUMNS)
+        workbook.save(file_path)
+        return count
+    
+    @staticmethod
+    def stream_receipts_to_csv(rows: Iterable[Tuple], file_path: str) -> int:
+        """Write rows to a CSV file as they arrive"""
+        count = 0
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(RECEIPT_EXPORT_COLUMNS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+    
+    @staticmethod
+    def stream_receipts_to_parquet(rows: Iterable[Tuple], file_path: str, batch_size: int = 50000) -> int:
+        """Write rows to Parquet in record batches (requires pyarrow)"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Parquet export requires pyarrow (pip install pyarrow)")
+        
+        schema = pa.schema([
+            ('Receipt ID', pa.int64()), ('Store', pa.string()), ('Date', pa.string()),
+            ('Row', pa.int64()), ('Item', pa.string()), ('Price', pa.float64()), ('Category', pa.string()),
+        ])
+        rows = iter(rows)
+        count = 0
+        with pq.ParquetWriter(file_path, schema) as writer:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                columns = list(zip(*batch))
+                writer.write_batch(pa.record_batch(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                count += len(batch)
+        return count
+    
     @staticmethod
     def validate_item_data(item: Dict) -> bool:
         """Validate item data"""
@@ -2,7 +2,10 @@
 import sqlite3
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Sequence, Set, Tuple
+from config import settings
+from migrations import migrate
+from utils.helpers import compress_text, decompress_text
 
 class DatabaseManager:
     """Handles all database operations"""
@@ -18,6 +21,13 @@ class DatabaseManager:
         self.conn = sqlite3.connect(self.db_name)
         self.cursor = self.conn.cursor()
         
+        # WAL + relaxed fsync: commits stay durable across app crashes and
+        # readers no longer block the writer during bulk imports
+        self.cursor.execute(f'PRAGMA journal_mode={settings.DB_JOURNAL_MODE}')
+        self.cursor.execute(f'PRAGMA synchronous={settings.DB_SYNCHRONOUS}')
+        self.cursor.execute(f'PRAGMA cache_size={-settings.DB_CACHE_SIZE_KB}')
+        self.cursor.execute('PRAGMA temp_store=MEMORY')
+        
         # Create receipts table
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS receipts (
@@ -45,29 +55,172 @@ class DatabaseManager:
         ''')
         
         self.conn.commit()
+        
+        # Bring older databases up to the current schema (columns, indexes)
+        migrate(self.conn)
     
-    def save_receipt(self, store_name: str, date: str, items: List[Dict]) -> int:
+    def save_receipt(self, store_name: str, date: str, items: List[Dict], image_hash: str = None,
+                     ocr_text: str = None, extraction: str = None) -> int:
         """Save receipt and its items to database"""
-        total_amount = sum(item['price'] * item['quantity'] for item in items)
+        return self.save_receipts([{
+            'store_name': store_name,
+            'date': date,
+            'items': items,
+            'image_hash': image_hash,
+            'ocr_text': ocr_text,
+            'extraction': extraction,
+        }])[0]
+    
+    def save_receipts(self, receipts: List[Dict]) -> List[int]:
+        """Save many receipts in a single transaction
         
-        # Insert receipt
-        self.cursor.execute('''
-            INSERT INTO receipts (store_name, date, total_amount)
-            VALUES (?, ?, ?)
-        ''', (store_name, date, total_amount))
+        Each receipt is a dict with 'store_name', 'date', 'items' and
+        optional 'image_hash', 'ocr_text' (stored compressed) and
+        'extraction' (the pipeline's item extraction mode). Returns the
+        new receipt ids in order.
+        """
+        receipt_ids = []
+        item_rows = []
+        
+        with self.conn:
+            for receipt in receipts:
+                items = receipt['items']
+                total_amount = sum(item['price'] * item['quantity'] for item in items)
+                
+                # Insert receipt
+                self.cursor.execute('''
+                    INSERT INTO receipts (store_name, date, total_amount, image_hash, ocr_text, extraction)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (receipt['store_name'], receipt['date'], total_amount, receipt.get('image_hash'),
+                      compress_text(receipt.get('ocr_text')), receipt.get('extraction')))
+                
+                receipt_id = self.cursor.lastrowid
+                receipt_ids.append(receipt_id)
+                item_rows.extend(
+                    (receipt_id, item['row_number'], item['english_name'], item['dutch_name'],
+                     item['price'], item['quantity'], item['category'])
+                    for item in items
+                )
+            
+            # Insert items
+            self.cursor.executemany('''
+                INSERT INTO items (receipt_id, row_number, item_name, item_name_dutch, price, quantity, category)
+                VALUES (?,?, ?, ?, ?, ?, ?)
+            ''', item_rows)
+            
+            if receipt_ids:
+                self._update_rollups('r.id BETWEEN ? AND ?', (receipt_ids[0], receipt_ids[-1]))
         
-        receipt_id = self.cursor.lastrowid
+        return receipt_ids
+    
+    def replace_receipt_items(self, receipt_items: List[Tuple[int, List[Dict]]]):
+        """Replace the items (and totals) of existing receipts in a single transaction
         
-        # Insert items
-        for item in items:
-            self.cursor.execute('''
+        Used when re-parsing stored OCR text. The analytics rollups are
+        updated in the same transaction, so an interrupted run leaves them
+        consistent with the receipts replaced so far.
+        """
+        receipt_ids = [receipt_id for receipt_id, _ in receipt_items]
+        chunks = [receipt_ids[start:start + 500] for start in range(0, len(receipt_ids), 500)]
+        with self.conn:
+            for chunk in chunks:
+                self._update_rollups(f"r.id IN ({','.join('?' * len(chunk))})", chunk, sign=-1)
+            self.cursor.executemany('DELETE FROM items WHERE receipt_id = ?',
+                                    [(receipt_id,) for receipt_id in receipt_ids])
+            self.cursor.executemany('''
                 INSERT INTO items (receipt_id, row_number, item_name, item_name_dutch, price, quantity, category)
                 VALUES (?,?, ?, ?, ?, ?, ?)
-            ''', (receipt_id, item['row_number'],item['english_name'], item['dutch_name'], 
-                  item['price'], item['quantity'], item['category']))
+            ''', [
+                (receipt_id, item['row_number'], item['english_name'], item['dutch_name'],
+                 item['price'], item['quantity'], item['category'])
+                for receipt_id, items in receipt_items for item in items
+            ])
+            self.cursor.executemany('UPDATE receipts SET total_amount = ? WHERE id = ?', [
+                (sum(item['price'] * item['quantity'] for item in items), receipt_id)
+                for receipt_id, items in receipt_items
+            ])
+            for chunk in chunks:
+                self._update_rollups(f"r.id IN ({','.join('?' * len(chunk))})", chunk)
+    
+    def get_receipt_texts(self, after_id: int = 0, limit: int = 500, store_name: str = None,
+                          include_manual: bool = False) -> List[Tuple[int, str]]:
+        """Next page (by id) of (receipt id, OCR text) for receipts whose items came from stored text
         
-        self.conn.commit()
-        return receipt_id
+        Receipts extracted from word boxes are left out: their text alone
+        cannot reproduce their items. So are receipts saved from the GUI
+        (extraction 'manual'), whose items the user checked and edited,
+        unless include_manual is set.
+        """
+        modes = ('text', 'manual') if include_manual else ('text',)
+        query = f'''
+            SELECT id, ocr_text FROM receipts
+            WHERE ocr_text IS NOT NULL AND IFNULL(extraction, 'text') IN ({','.join('?' * len(modes))}) AND id > ?
+        '''
+        params = [*modes, after_id]
+        if store_name:
+            query += ' AND store_name = ?'
+            params.append(store_name)
+        self.cursor.execute(query + ' ORDER BY id LIMIT ?', params + [limit])
+        return [(receipt_id, decompress_text(data)) for receipt_id, data in self.cursor.fetchall()]
+    
+    def get_receipt_items(self, receipt_ids: List[int]) -> Dict[int, List[Tuple[str, float, str, str]]]:
+        """(Dutch name, price, English name, category) of the items of each receipt"""
+        items = {receipt_id: [] for receipt_id in receipt_ids}
+        for start in range(0, len(receipt_ids), 500):
+            chunk = receipt_ids[start:start + 500]
+            self.cursor.execute(f'''
+                SELECT receipt_id, item_name_dutch, price, item_name, category
+                FROM items WHERE receipt_id IN ({','.join('?' * len(chunk))})
+                ORDER BY receipt_id, id
+            ''', chunk)
+            for receipt_id, dutch_name, price, english_name, category in self.cursor.fetchall():
+                items[receipt_id].append((dutch_name, price, english_name, category))
+        return items
+    
+    def _update_rollups(self, condition: str, params: Sequence, sign: int = 1):
+        """Add (sign=1) or subtract (sign=-1) the receipts matching condition in the analytics rollups
+        
+        condition is a WHERE clause on receipts aliased r. Rollup rows left
+        without receipts or items are deleted.
+        """
+        self.cursor.execute(f'''
+            INSERT INTO store_month_totals (store_name, month, total_amount, receipt_count)
+            SELECT IFNULL(r.store_name, ''), IFNULL(strftime('%Y-%m', r.date), ''),
+                   ? * SUM(r.total_amount), ? * COUNT(*)
+            FROM receipts r
+            WHERE {condition}
+            GROUP BY 1, 2
+            ON CONFLICT (store_name, month) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                receipt_count = receipt_count + excluded.receipt_count
+        ''', (sign, sign, *params))
+        
+        self.cursor.execute(f'''
+            INSERT INTO category_month_totals (category, month, total_amount, item_count)
+            SELECT IFNULL(i.category, ''), IFNULL(strftime('%Y-%m', r.date), ''),
+                   ? * SUM(i.price * i.quantity), ? * COUNT(*)
+            FROM items i
+            JOIN receipts r ON r.id = i.receipt_id
+            WHERE {condition}
+            GROUP BY 1, 2
+            ON CONFLICT (category, month) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                item_count = item_count + excluded.item_count
+        ''', (sign, sign, *params))
+        
+        if sign < 0:
+            self.cursor.execute('DELETE FROM store_month_totals WHERE receipt_count <= 0')
+            self.cursor.execute('DELETE FROM category_month_totals WHERE item_count <= 0')
+    
+    def rebuild_rollups(self):
+        """Recompute the analytics rollup tables from receipts and items"""
+        with self.conn:
+            self.cursor.execute('DELETE FROM store_month_totals')
+            self.cursor.execute('DELETE FROM category_month_totals')
+            self.cursor.execute('SELECT MIN(id), MAX(id) FROM receipts')
+            first_id, last_id = self.cursor.fetchone()
+            if first_id is not None:
+                self._update_rollups('r.id BETWEEN ? AND ?', (first_id, last_id))
     
     def get_all_receipts_with_items(self) -> List[Tuple]:
         """Get all receipts with their items"""
@@ -75,53 +228,133 @@ class DatabaseManager:
             SELECT r.id, r.store_name, r.date, i.row_number, i.item_name, i.price, i.category
             FROM receipts r
             JOIN items i ON r.id = i.receipt_id
-            ORDER BY r.date DESC, r.id
+            ORDER BY r.date DESC, r.id, i.id
         '''
         self.cursor.execute(query)
         return self.cursor.fetchall()
     
-    def get_filtered_receipts(self, store_name: str = None, date_from: str = None, date_to: str = None) -> List[Tuple]:
-        """Get filtered receipts"""
-        query = '''
-            SELECT r.id, r.store_name, r.date, i.row_number, i.item_name, i.price, i.category
-            FROM receipts r
-            JOIN items i ON r.id = i.receipt_id
-            WHERE 1=1
-        '''
+    @staticmethod
+    def _filter_clause(store_name: str = None, date_from: str = None,
+                       date_to: str = None) -> Tuple[str, List]:
+        """WHERE clause (aliases r for receipts) and parameters for the receipt filters"""
+        conditions = ['1=1']
         params = []
         
         if store_name:
-            query += ' AND r.store_name = ?'
+            conditions.append('r.store_name = ?')
             params.append(store_name)
         
         if date_from:
-            query += ' AND r.date >= ?'
+            conditions.append('r.date >= ?')
             params.append(date_from)
         
         if date_to:
-            query += ' AND r.date <= ?'
+            conditions.append('r.date <= ?')
             params.append(date_to)
         
-        query += ' ORDER BY r.date DESC, r.id'
+        return ' WHERE ' + ' AND '.join(conditions), params
+    
+    def get_filtered_receipts(self, store_name: str = None, date_from: str = None, date_to: str = None) -> List[Tuple]:
+        """Get filtered receipts"""
+        query = '''
+            SELECT r.id, r.store_name, r.date, i.row_number, i.item_name, i.price, i.category
+            FROM receipts r
+            JOIN items i ON r.id = i.receipt_id
+        '''
+        clause, params = self._filter_clause(store_name, date_from, date_to)
+        query += clause + ' ORDER BY r.date DESC, r.id, i.id'
         
         self.cursor.execute(query, params)
         return self.cursor.fetchall()
     
+    def iter_receipts_with_items(self, store_name: str = None, date_from: str = None,
+                                 date_to: str = None, batch_size: int = 5000) -> Iterator[Tuple]:
+        """Stream receipt item rows (same columns as get_filtered_receipts) in bounded memory"""
+        query = '''
+            SELECT r.id, r.store_name, r.date, i.row_number, i.item_name, i.price, i.category
+            FROM receipts r
+            JOIN items i ON r.id = i.receipt_id
+        '''
+        clause, params = self._filter_clause(store_name, date_from, date_to)
+        query += clause + ' ORDER BY r.date DESC, r.id, i.id'
+        
+        # Own cursor so other queries can run while the caller consumes rows
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+    
+    def get_receipts_page(self, after: Optional[Tuple[Optional[str], int, int]] = None, limit: int = 200,
+                          store_name: str = None, date_from: str = None,
+                          date_to: str = None) -> Tuple[List[Tuple], Optional[Tuple[Optional[str], int, int]]]:
+        """Get one page of receipt items, newest first, using keyset pagination
+        
+        Rows are ordered by (receipt date DESC, receipt id, item id),
+        undated receipts last, the same order as get_filtered_receipts.
+        Pass the returned cursor as ``after`` to fetch the next page; it is
+        None on the last page.
+        """
+        query = '''
+            SELECT r.id, r.store_name, r.date, i.row_number, i.item_name, i.price, i.category, i.id
+            FROM receipts r
+            JOIN items i ON r.id = i.receipt_id
+        '''
+        clause, params = self._filter_clause(store_name, date_from, date_to)
+        query += clause
+        
+        after_date, after_receipt, after_item = after if after is not None else (None, None, None)
+        rows = []
+        
+        # Dated receipts; the range condition lets SQLite seek on the date index
+        if after is None or after_date is not None:
+            dated_query = query + ' AND r.date IS NOT NULL'
+            dated_params = list(params)
+            if after is not None:
+                dated_query += ' AND r.date <= ? AND (r.date < ? OR (r.id, i.id) > (?, ?))'
+                dated_params.extend([after_date, after_date, after_receipt, after_item])
+            self.cursor.execute(dated_query + ' ORDER BY r.date DESC, r.id, i.id LIMIT ?', dated_params + [limit])
+            rows = self.cursor.fetchall()
+            after_receipt = after_item = None
+        
+        # Then undated receipts, which cannot match a date filter
+        if len(rows) < limit and not (date_from or date_to):
+            undated_query = query + ' AND r.date IS NULL'
+            undated_params = list(params)
+            if after_receipt is not None:
+                undated_query += ' AND (r.id, i.id) > (?, ?)'
+                undated_params.extend([after_receipt, after_item])
+            self.cursor.execute(undated_query + ' ORDER BY r.id, i.id LIMIT ?', undated_params + [limit - len(rows)])
+            rows += self.cursor.fetchall()
+        
+        next_cursor = (rows[-1][2], rows[-1][0], rows[-1][7]) if len(rows) == limit else None
+        return [row[:7] for row in rows], next_cursor
+    
+    def get_ingested_hashes(self) -> Set[str]:
+        """Get the image hashes of all receipts ingested from image files"""
+        self.cursor.execute('SELECT image_hash FROM receipts WHERE image_hash IS NOT NULL')
+        return {row[0] for row in self.cursor.fetchall()}
+    
     def get_all_stores(self) -> List[str]:
         """Get all unique store names"""
         self.cursor.execute('SELECT DISTINCT store_name FROM receipts ORDER BY store_name')
         return [row[0] for row in self.cursor.fetchall()]
     
     def get_expense_summary(self) -> Dict:
-        """Get expense summary data"""
+        """Get expense summary data (from the per-month rollup tables)"""
         # Total expenses
-        self.cursor.execute('SELECT SUM(total_amount) FROM receipts')
+        self.cursor.execute('SELECT SUM(total_amount) FROM store_month_totals')
         total = self.cursor.fetchone()[0] or 0
         
         # Expenses by store
         self.cursor.execute('''
-            SELECT store_name, SUM(total_amount), COUNT(*)
-            FROM receipts
+            SELECT NULLIF(store_name, ''), SUM(total_amount), SUM(receipt_count)
+            FROM store_month_totals
             GROUP BY store_name
             ORDER BY SUM(total_amount) DESC
         ''')
@@ -129,10 +362,10 @@ class DatabaseManager:
         
         # Expenses by category
         self.cursor.execute('''
-            SELECT i.category, SUM(i.price * i.quantity)
-            FROM items i
-            GROUP BY i.category
-            ORDER BY SUM(i.price * i.quantity) DESC
+            SELECT NULLIF(category, ''), SUM(total_amount)
+            FROM category_month_totals
+            GROUP BY category
+            ORDER BY SUM(total_amount) DESC
         ''')
         category_data = self.cursor.fetchall()
         
@@ -143,14 +376,14 @@ class DatabaseManager:
         }
     
     def get_monthly_report(self) -> List[Tuple]:
-        """Get monthly expense report"""
+        """Get monthly expense report (from the per-month rollup table)"""
         self.cursor.execute('''
             SELECT 
-                strftime('%Y-%m', date) as month,
+                NULLIF(month, '') as month,
                 SUM(total_amount) as total,
-                COUNT(*) as receipts
-            FROM receipts
-            GROUP BY strftime('%Y-%m', date)
+                SUM(receipt_count) as receipts
+            FROM store_month_totals
+            GROUP BY month
             ORDER BY month DESC
         ''')
         return self.cursor.fetchall()
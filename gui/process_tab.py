@@ -9,6 +9,7 @@ from typing import List, Dict, Optional
 from image_processor import ImageProcessor
 from translator import TranslationService
 from data_manager import DataManager
+from utils.helpers import image_hash
 
 class ProcessTab:
     """Tab for processing receipts"""
@@ -21,6 +22,8 @@ class ProcessTab:
         
         self.frame = ttk.Frame(parent)
         self.current_image_path = None
+        self.extracted_text = None
+        self.extracted_image_hash = None
         self.extracted_items = []
         
         self.create_widgets()
@@ -135,7 +138,12 @@ class ProcessTab:
             # Extract text from image
             text = self.image_processor.extract_text_from_image(self.current_image_path)
             
+            # Hashed like `manage ingest` does, so it skips receipts saved here
+            with open(self.current_image_path, 'rb') as f:
+                self.extracted_image_hash = image_hash(f.read())
+            
             # Extract items and prices
+            self.extracted_text = text
             self.extracted_items = self.image_processor.extract_items_from_text(text)
             
             # Translate items
@@ -297,7 +305,11 @@ class ProcessTab:
             store_name = self.store_entry.get() or "Unknown Store"
             receipt_date = self.date_entry.get()
             
-            receipt_id = self.db_manager.save_receipt(store_name, receipt_date, self.extracted_items)
+            receipt_id = self.db_manager.save_receipt(store_name, receipt_date, self.extracted_items,
+                                                      image_hash=self.extracted_image_hash,
+                                                      ocr_text=self.extracted_text,
+                                                      # Reviewed and edited here; reprocess leaves it alone
+                                                      extraction='manual')
             
             messagebox.showinfo("Success", f"Receipt saved to database! (ID: {receipt_id})")
             
@@ -333,6 +345,8 @@ class ProcessTab:
     
     def clear_form(self):
         """Clear form data"""
+        self.extracted_text = None
+        self.extracted_image_hash = None
         self.extracted_items = []
         self.update_items_display()
         self.store_entry.delete(0, tk.END)
@@ -3,6 +3,7 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from data_manager import DataManager
+from config import settings
 
 class ViewTab:
     """Tab for viewing stored data"""
@@ -11,6 +12,12 @@ class ViewTab:
         self.db_manager = db_manager
         self.data_manager = DataManager()
         
+        # Keyset pagination state: rows are loaded page by page on scroll
+        self.filters = {}
+        self.next_cursor = None
+        self.has_more = False
+        self.loading = False
+        
         self.frame = ttk.Frame(parent)
         self.create_widgets()
     
@@ -63,23 +70,43 @@ class ViewTab:
             self.data_tree.heading(col, text=col)
             self.data_tree.column(col, width=120)
         
-        data_scrollbar = ttk.Scrollbar(data_frame, orient='vertical', command=self.data_tree.yview)
-        self.data_tree.configure(yscrollcommand=data_scrollbar.set)
+        self.data_scrollbar = ttk.Scrollbar(data_frame, orient='vertical', command=self.data_tree.yview)
+        self.data_tree.configure(yscrollcommand=self.on_tree_scroll)
         
         self.data_tree.pack(side='left', fill='both', expand=True)
-        data_scrollbar.pack(side='right', fill='y')
+        self.data_scrollbar.pack(side='right', fill='y')
+    
+    def on_tree_scroll(self, first, last):
+        """Update the scrollbar and fetch the next page near the bottom"""
+        self.data_scrollbar.set(first, last)
+        if self.has_more and not self.loading and float(last) >= 0.9:
+            self.loading = True
+            self.frame.after_idle(self.load_next_page)
+    
+    def reset_view(self, filters: dict):
+        """Clear the treeview and start paging from the first row"""
+        self.data_tree.delete(*self.data_tree.get_children())
+        self.filters = filters
+        self.next_cursor = None
+        self.has_more = True
+        self.load_next_page()
+    
+    def load_next_page(self):
+        """Append the next page of rows to the treeview"""
+        try:
+            rows, self.next_cursor = self.db_manager.get_receipts_page(
+                after=self.next_cursor, limit=settings.VIEW_PAGE_SIZE, **self.filters
+            )
+            self.has_more = self.next_cursor is not None
+            
+            for row in rows:
+                self.data_tree.insert('', 'end', values=row)
+        finally:
+            self.loading = False
     
     def refresh_data(self):
         """Refresh data display"""
-        # Clear existing data
-        for item in self.data_tree.get_children():
-            self.data_tree.delete(item)
-        
-        # Load data from database
-        rows = self.db_manager.get_all_receipts_with_items()
-        
-        for row in rows:
-            self.data_tree.insert('', 'end', values=row)
+        self.reset_view({})
         
         # Update store filter
         stores = self.db_manager.get_all_stores()
@@ -87,37 +114,26 @@ class ViewTab:
     
     def apply_filter(self):
         """Apply filters to data view"""
-        # Clear existing data
-        for item in self.data_tree.get_children():
-            self.data_tree.delete(item)
-        
-        # Get filtered data
-        rows = self.db_manager.get_filtered_receipts(
-            store_name=self.filter_store.get() or None,
-            date_from=self.filter_date_from.get() or None,
-            date_to=self.filter_date_to.get() or None
-        )
-        
-        for row in rows:
-            self.data_tree.insert('', 'end', values=row)
+        self.reset_view({
+            'store_name': self.filter_store.get() or None,
+            'date_from': self.filter_date_from.get() or None,
+            'date_to': self.filter_date_to.get() or None
+        })
     
     def export_selected(self):
-        """Export filtered data to Excel"""
+        """Export filtered data to Excel/CSV/Parquet"""
         try:
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx")]
+                filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("Parquet files", "*.parquet")]
             )
             
             if file_path:
-                # Get data from tree view
-                data = []
-                for child in self.data_tree.get_children():
-                    values = self.data_tree.item(child)['values']
-                    data.append(values)
-                
-                self.data_manager.export_receipts_to_excel(data, file_path)
-                messagebox.showinfo("Success", f"Data exported to {file_path}")
+                # Stream straight from the database with the current filters;
+                # the view itself only holds the pages scrolled so far
+                rows = self.db_manager.iter_receipts_with_items(**self.filters)
+                count = self.data_manager.export_receipts(rows, file_path)
+                messagebox.showinfo("Success", f"{count} rows exported to {file_path}")
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error exporting data: {str(e)}")
@@ -1,13 +1,20 @@
 # image_processor.py
 # from nt import replace
 import cv2
+import numpy as np
 import pytesseract
 import re
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
 from PIL import Image
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 import os
 import platform
 import shutil
+import threading
+
+import metrics
+from config import settings
 
 # pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 # # ...
@@ -33,105 +40,749 @@ def configure_tesseract():
         "Tesseract not found. Install it, or set TESSERACT_CMD to its full path."
     )
 
-configure_tesseract()
+
+class OCRBackend:
+    """Interface for the Tesseract bindings ImageProcessor can recognize text with"""
+
+    name = None
+
+    def image_to_string(self, img: np.ndarray) -> str:
+        raise NotImplementedError
+
+    def image_to_data(self, img: np.ndarray) -> Dict[str, list]:
+        """Words with their block/paragraph/line numbers, boxes and confidences (pytesseract's DICT layout)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """Runs the tesseract executable once per call"""
+
+    name = "pytesseract"
+
+    def __init__(self):
+        configure_tesseract()
+
+    def image_to_string(self, img: np.ndarray) -> str:
+        # Main config: assume block of text, preserve spacing
+        return pytesseract.image_to_string(img, lang=settings.OCR_LANGUAGES, config=settings.TESSERACT_CONFIG)
+
+    def image_to_data(self, img: np.ndarray) -> Dict[str, list]:
+        return pytesseract.image_to_data(
+            img, lang=settings.OCR_LANGUAGES, config=settings.TESSERACT_CONFIG,
+            output_type=pytesseract.Output.DICT
+        )
+
+
+class TesserocrBackend(OCRBackend):
+    """Keeps Tesseract loaded in-process through the tesserocr C-API binding
+
+    The language models are loaded once per thread (a TessBaseAPI must not
+    be shared between threads) and reused for every later image.
+    """
+
+    name = "tesserocr"
+
+    _CONFIG_OPTION = re.compile(r"--(oem|psm)\s+(\d+)|-c\s+(\w+)=(\S+)")
+
+    def __init__(self):
+        import tesserocr
+        self.tesserocr = tesserocr
+        self.oem, self.psm, self.variables = self.parse_config(settings.TESSERACT_CONFIG)
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+        # Load the models now so a broken install fails here, not on the first image
+        self._api()
+
+    @classmethod
+    def parse_config(cls, config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+        """Split a tesseract command line config into OEM, PSM and -c variables"""
+        oem = psm = None
+        variables = {}
+        for option, number, key, value in cls._CONFIG_OPTION.findall(config):
+            if option == "oem":
+                oem = int(number)
+            elif option == "psm":
+                psm = int(number)
+            else:
+                variables[key] = value
+        return oem, psm, variables
+
+    def _api(self):
+        """This thread's engine, created on first use"""
+        api = getattr(self._local, "api", None)
+        if api is None:
+            options = {'lang': settings.OCR_LANGUAGES}
+            if self.oem is not None:
+                options['oem'] = self.oem
+            if self.psm is not None:
+                options['psm'] = self.psm
+            api = self.tesserocr.PyTessBaseAPI(**options)
+            for key, value in self.variables.items():
+                api.SetVariable(key, value)
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    def image_to_string(self, img: np.ndarray) -> str:
+        api = self._api()
+        api.SetImage(Image.fromarray(img))
+        return api.GetUTF8Text()
+
+    def image_to_data(self, img: np.ndarray) -> Dict[str, list]:
+        RIL = self.tesserocr.RIL
+        api = self._api()
+        api.SetImage(Image.fromarray(img))
+        api.Recognize()
+        
+        data = {'block_num': [], 'par_num': [], 'line_num': [], 'text': [], 'conf': [],
+                'left': [], 'top': [], 'width': [], 'height': []}
+        block = par = line = 0
+        for word in self.tesserocr.iterate_level(api.GetIterator(), RIL.WORD):
+            if word.IsAtBeginningOf(RIL.BLOCK):
+                block, par, line = block + 1, 0, 0
+            if word.IsAtBeginningOf(RIL.PARA):
+                par, line = par + 1, 0
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line += 1
+            data['block_num'].append(block)
+            data['par_num'].append(par)
+            data['line_num'].append(line)
+            data['text'].append(word.GetUTF8Text(RIL.WORD) or '')
+            data['conf'].append(word.Confidence(RIL.WORD))
+            left, top, right, bottom = word.BoundingBox(RIL.WORD) or (0, 0, 0, 0)
+            data['left'].append(left)
+            data['top'].append(top)
+            data['width'].append(right - left)
+            data['height'].append(bottom - top)
+        return data
+
+    def close(self):
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis.clear()
+        self._local = threading.local()
+
+
+def create_ocr_backend(name: str = None) -> OCRBackend:
+    """Build the OCR backend selected in settings (or by name)
+
+    "auto" prefers the persistent tesserocr engine and falls back to
+    pytesseract when the binding is not installed.
+    """
+    name = (name or settings.OCR_ENGINE).lower()
+    if name == 'tesserocr':
+        return TesserocrBackend()
+    if name == 'pytesseract':
+        return PytesseractBackend()
+    if name == 'auto':
+        try:
+            return TesserocrBackend()
+        except ImportError:
+            return PytesseractBackend()
+    raise ValueError(f"Unknown OCR engine: {name}")
+
+
+# Preprocessing pseudo-profile that escalates from fast to thorough on low OCR confidence
+AUTO_PROFILE = "auto"
+
+
+def available_profiles() -> List[str]:
+    """Names accepted wherever a preprocessing profile can be chosen"""
+    return [*settings.PREPROCESS_PROFILES, AUTO_PROFILE]
 
 
 class ImageProcessor:
     """Handles image processing and OCR operations"""
     
-    def __init__(self):
+    def __init__(self, profile: str = None, ocr_backend: Optional[OCRBackend] = None):
         
         # Configure tesseract path if needed
         # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        pass
+        self.profile = self._resolve_profile(profile or settings.PREPROCESS_PROFILE)
+        self._ocr_backend = ocr_backend
+        self._band_pool = None
+        self._band_pool_lock = threading.Lock()
     
-    def preprocess_image(self, image_path: str):
+    @property
+    def ocr_backend(self) -> OCRBackend:
+        """The OCR engine, created on first use (text parsing alone never needs one)"""
+        if self._ocr_backend is None:
+            self._ocr_backend = create_ocr_backend()
+        return self._ocr_backend
+    
+    @property
+    def band_pool(self) -> ThreadPoolExecutor:
+        """Threads for strip OCR, kept for the processor's lifetime
+        
+        tesserocr loads one engine per thread, so reusing the same
+        OCR_STRIPS threads keeps the number of loaded models fixed.
+        """
+        with self._band_pool_lock:
+            if self._band_pool is None:
+                self._band_pool = ThreadPoolExecutor(
+                    max_workers=max(1, settings.OCR_STRIPS), thread_name_prefix='ocr-band'
+                )
+            return self._band_pool
+    
+    def close(self):
+        """Stop the strip OCR threads and release the OCR engines"""
+        with self._band_pool_lock:
+            if self._band_pool is not None:
+                self._band_pool.shutdown(wait=True)
+                self._band_pool = None
+        if self._ocr_backend is not None:
+            self._ocr_backend.close()
+    
+    def _resolve_profile(self, profile: Optional[str]) -> str:
+        """Return a valid profile name, defaulting to this processor's profile"""
+        profile = profile or self.profile
+        if profile not in available_profiles():
+            raise ValueError(
+                f"Unknown preprocessing profile '{profile}' "
+                f"(expected one of: {', '.join(available_profiles())})"
+            )
+        return profile
+    
+    def decode_image(self, data: Union[bytes, bytearray, memoryview, np.ndarray]) -> np.ndarray:
+        """Decode an encoded image buffer (e.g. an upload) without touching disk"""
+        if isinstance(data, np.ndarray) and data.ndim >= 2:
+            # Already a decoded image
+            return data
+        buf = np.frombuffer(memoryview(data), dtype=np.uint8)
+        with metrics.stage('decode'):
+            img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image data")
+        return img
+
+    def preprocess_image(self, image_path: str, profile: str = None):
         """Preprocess image for better OCR results"""
-        img = cv2.imread(image_path)
+        return self.preprocess_array(self.load_image(image_path), profile)
+
+    def load_image(self, image_path: str) -> np.ndarray:
+        """Read an image file as a BGR array"""
+        with metrics.stage('decode'):
+            img = cv2.imread(image_path)
         if img is None:
             raise ValueError(f"Could not load image at path: {image_path}")
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return img
+
+    def preprocess_array(self, img: np.ndarray, profile: str = None):
+        """Preprocess an already decoded BGR (or grayscale) image"""
+        profile = self._resolve_profile(profile)
+        if profile == AUTO_PROFILE:
+            profile = settings.PREPROCESS_AUTO_ORDER[0]
+        steps = settings.PREPROCESS_PROFILES[profile]
+        
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        
+        # Denoising cost grows with pixel count, so normalize the size first
+        with metrics.stage('scale'):
+            gray = self.normalize_scale(gray, steps['scale'])
         
         # Apply denoising
-        denoised = cv2.fastNlMeansDenoising(gray)
+        if steps['denoise']:
+            with metrics.stage('denoise'):
+                gray = cv2.fastNlMeansDenoising(gray)
+        
+        if steps['deskew']:
+            with metrics.stage('deskew'):
+                gray = self.deskew(gray)
         
         # Apply threshold for better text recognition
-        _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        with metrics.stage('threshold'):
+            if steps['threshold'] == 'adaptive':
+                # Local threshold copes with uneven lighting without a denoise pass
+                return cv2.adaptiveThreshold(
+                    gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+                )
+            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
         return thresh
     
-    def extract_text_from_image(self, image_path: str) -> str:
-       
+    def normalize_scale(self, gray: np.ndarray, scale_profile: str) -> np.ndarray:
+        """Resize so text is about the profile's text height, within its pixel budget"""
+        profile = settings.IMAGE_SCALE_PROFILES[scale_profile]
+        h, w = gray.shape[:2]
+        
+        text_height = self.estimate_text_height(gray)
+        if text_height:
+            scale = min(profile['text_height'] / text_height, profile['max_upscale'])
+        else:
+            # No measurable text; fall back to the configured bounding box
+            max_w, max_h = settings.MAX_IMAGE_SIZE
+            scale = min(max_w / w, max_h / h, 1.0)
+        
+        # Keep the per-image cost bounded whatever the input resolution
+        scale = min(scale, (profile['max_pixels'] / (h * w)) ** 0.5)
+        
+        if abs(scale - 1.0) < 0.05:
+            return gray
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        return cv2.resize(gray, size, interpolation=interpolation)
+    
+    def estimate_text_height(self, gray: np.ndarray) -> Optional[float]:
+        """Median height in pixels of character-sized blobs, or None if too few are found"""
+        h, w = gray.shape[:2]
+        
+        # Measure on a thumbnail; blob heights scale linearly with it
+        factor = min(1.0, 1500 / max(h, w))
+        thumb = gray
+        if factor < 1.0:
+            thumb = cv2.resize(gray, (round(w * factor), round(h * factor)), interpolation=cv2.INTER_AREA)
+        
+        binary = cv2.adaptiveThreshold(
+            thumb, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10
+        )
+        _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        
+        # Drop specks, rules, borders and merged blocks
+        glyphs = (heights >= 3) & (heights <= thumb.shape[0] / 15) & (widths <= heights * 3)
+        if np.count_nonzero(glyphs) < 20:
+            return None
+        return float(np.median(heights[glyphs])) / factor
+    
+    def crop_to_receipt(self, img: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Cut the receipt out of a photo and flatten its perspective
+        
+        Returns the cropped image and its area as a fraction of the original
+        (1.0 when no receipt boundary was found and the photo is kept whole).
+        """
+        corners = self.detect_receipt(img)
+        if corners is None:
+            return img, 1.0
+        
+        top_left, top_right, bottom_right, bottom_left = corners
+        width = int(round(max(np.linalg.norm(top_right - top_left), np.linalg.norm(bottom_right - bottom_left))))
+        height = int(round(max(np.linalg.norm(bottom_left - top_left), np.linalg.norm(bottom_right - top_right))))
+        if width < 2 or height < 2:
+            return img, 1.0
+        
+        target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(corners, target)
+        cropped = cv2.warpPerspective(img, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                                      borderMode=cv2.BORDER_REPLICATE)
+        return cropped, (width * height) / (img.shape[0] * img.shape[1])
+    
+    def detect_receipt(self, img: np.ndarray) -> Optional[np.ndarray]:
+        """Find the receipt's corners (TL, TR, BR, BL in full-size pixels), or None"""
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape[:2]
+        
+        # Contours are found on a small copy; corners are scaled back afterwards
+        factor = min(1.0, 800 / max(h, w))
+        small = cv2.resize(gray, (max(1, round(w * factor)), max(1, round(h * factor))), interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        min_area = settings.RECEIPT_MIN_AREA * small.shape[0] * small.shape[1]
+        max_area = 0.98 * small.shape[0] * small.shape[1]
+        
+        # Paper edges first: the largest convex quadrilateral
+        edges = cv2.dilate(cv2.Canny(small, 50, 150), np.ones((3, 3), np.uint8))
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        quad = None
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+            area = cv2.contourArea(contour)
+            if area < min_area:
+                break
+            approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+            if len(approx) == 4 and cv2.isContourConvex(approx) and area <= max_area:
+                quad = approx.reshape(4, 2).astype(np.float32)
+                break
+        
+        # Otherwise the bright paper against a darker background
+        if quad is None:
+            _, paper = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            paper = cv2.morphologyEx(paper, cv2.MORPH_CLOSE, np.ones((15, 15), np.uint8))
+            contours, _ = cv2.findContours(paper, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if not contours:
+                return None
+            contour = max(contours, key=cv2.contourArea)
+            if not min_area <= cv2.contourArea(contour) <= max_area:
+                return None
+            quad = cv2.boxPoints(cv2.minAreaRect(contour)).astype(np.float32)
+        
+        return self._order_corners(quad / factor)
+    
+    def _order_corners(self, points: np.ndarray) -> np.ndarray:
+        """Order four points as top-left, top-right, bottom-right, bottom-left"""
+        sums = points.sum(axis=1)
+        diffs = np.diff(points, axis=1).ravel()
+        return np.array([
+            points[np.argmin(sums)], points[np.argmin(diffs)],
+            points[np.argmax(sums)], points[np.argmax(diffs)],
+        ], dtype=np.float32)
+    
+    def deskew(self, gray: np.ndarray) -> np.ndarray:
+        """Rotate by the angle that makes text rows most distinct (projection profile search)"""
+        h, w = gray.shape[:2]
+        
+        # Search on a small inked copy, then rotate the full image once
+        factor = min(1.0, 600 / max(h, w))
+        thumb = cv2.resize(gray, (max(1, round(w * factor)), max(1, round(h * factor))),
+                           interpolation=cv2.INTER_AREA)
+        _, ink = cv2.threshold(thumb, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        ink = ink.astype(np.float32)
+        
+        limit = settings.DESKEW_MAX_ANGLE
+        angle = max(np.arange(-limit, limit + 0.5, 1.0), key=lambda a: self._row_contrast(ink, a))
+        angle = max(np.arange(angle - 1.0, angle + 1.05, 0.2), key=lambda a: self._row_contrast(ink, a))
+        
+        if abs(angle) < 0.3:
+            return gray
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), float(angle), 1.0)
+        return cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    
+    def _row_contrast(self, ink: np.ndarray, angle: float) -> float:
+        """Variance of per-row ink after rotating; peaks when lines are horizontal"""
+        h, w = ink.shape[:2]
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), float(angle), 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (w, h), flags=cv2.INTER_NEAREST)
+        return float(np.var(rotated.sum(axis=1)))
+    
+    def extract_text_from_image(self, image_path: str, profile: str = None) -> str:
+        """Extract text from an image file"""
         try:
-            processed_img = self.preprocess_image(image_path)
-
-            # Main config: assume block of text, preserve spacing
-            config = "--oem 3 --psm 6 -c preserve_interword_spaces=1"
-            text = pytesseract.image_to_string(
-                processed_img, lang="nld+eng", config=config
-            ).strip()
-
-            # --- Post-processing cleanup ---
-            # Fix common OCR mistakes
-            text = text.replace("’", "'").replace("‘", "'").replace("°", "0").replace("~","-")
-            # Fix 3/19 -> 3.19
-            text = re.sub(r"(\d)[/](\d)", r"\1.\2", text)
-            # Fix 1138 -> 11.38
-            text = re.sub(r"(\d)\s+(\d{2})", r"\1.\2", text)
+            img = self.load_image(image_path)
+        except ValueError as e:
+            raise Exception(f"Error extracting text from image: {str(e)}")
+        return self.run_ocr(img, profile)['text']
 
-            return text
+    def extract_text_from_bytes(self, data: Union[bytes, bytearray, memoryview, np.ndarray],
+                                profile: str = None) -> str:
+        """Extract text from an in-memory image buffer or decoded array"""
+        return self.run_ocr(data, profile)['text']
 
+    def run_ocr(self, data: Union[bytes, bytearray, memoryview, np.ndarray], profile: str = None,
+                word_boxes: bool = False) -> Dict:
+        """OCR an image with a preprocessing profile
+        
+        Returns the text, the profile that produced it, Tesseract's mean
+        word confidence (None when only plain text was requested) and the
+        fraction of the photo kept by receipt cropping. With word_boxes the
+        recognized 'lines' (word boxes and confidences, for
+        extract_items_from_words) are included too. Auto mode starts with
+        the cheapest profile and escalates while the confidence stays below
+        PREPROCESS_AUTO_MIN_CONFIDENCE, keeping the most confident result.
+        Undecodable data and unknown profiles raise ValueError.
+        """
+        img = self.decode_image(data)
+        profile = self._resolve_profile(profile)
+        try:
+            crop_ratio = 1.0
+            if settings.RECEIPT_DETECTION:
+                with metrics.stage('crop'):
+                    img, crop_ratio = self.crop_to_receipt(img)
+            
+            if profile != AUTO_PROFILE and not word_boxes:
+                text = self._ocr(self.preprocess_array(img, profile))
+                return {'text': text, 'profile': profile, 'confidence': None, 'crop_ratio': crop_ratio}
+            
+            best = best_lines = None
+            for name in settings.PREPROCESS_AUTO_ORDER if profile == AUTO_PROFILE else [profile]:
+                processed = self.preprocess_array(img, name)
+                with metrics.stage('tesseract'):
+                    lines = self._recognize(processed, self._tesseract_data)
+                confidences = [word['conf'] for line in lines for word in line['words']]
+                confidence = sum(confidences) / len(confidences) if confidences else 0.0
+                if best is None or confidence > best['confidence']:
+                    text = self._clean_text('\n'.join(line['text'] for line in lines))
+                    best = {'text': text, 'profile': name, 'confidence': confidence, 'crop_ratio': crop_ratio}
+                    best_lines = lines
+                if confidence >= settings.PREPROCESS_AUTO_MIN_CONFIDENCE:
+                    break
+            if word_boxes:
+                best['lines'] = best_lines
+            return best
         except Exception as e:
             raise Exception(f"Error extracting text from image: {str(e)}")
+
+    def _ocr(self, processed_img) -> str:
+        """Run Tesseract on a preprocessed image and clean up the result"""
+        with metrics.stage('tesseract'):
+            lines = self._recognize(processed_img, self._tesseract_text)
+        return self._clean_text('\n'.join(line['text'] for line in lines))
+
+    def _tesseract_text(self, img) -> List[Dict]:
+        """Plain Tesseract text as line records without words"""
+        text = self.ocr_backend.image_to_string(img).strip()
+        return [{'text': line, 'words': []} for line in text.split('\n')]
+
+    def _tesseract_data(self, img) -> List[Dict]:
+        """Tesseract lines rebuilt from word boxes, each word with its box and confidence"""
+        data = self.ocr_backend.image_to_data(img)
+        
+        # Rebuild the lines, with a blank line between paragraphs like image_to_string
+        lines = []
+        current = None
+        for i, word in enumerate(data['text']):
+            conf = float(data['conf'][i])
+            if conf < 0 or not word.strip():
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            if current is not None and key[:2] != current[:2]:
+                lines.append({'text': '', 'words': []})
+            if key != current:
+                lines.append({'text': word, 'words': []})
+                current = key
+            else:
+                lines[-1]['text'] += ' ' + word
+            lines[-1]['words'].append({
+                'text': word, 'conf': conf,
+                'left': int(data['left'][i]), 'top': int(data['top'][i]),
+                'width': int(data['width'][i]), 'height': int(data['height'][i]),
+            })
+        
+        return lines
+
+    def _recognize(self, processed_img, engine) -> List[Dict]:
+        """Run engine on the whole image, or on its horizontal strips concurrently"""
+        bands = self.split_into_bands(processed_img)
+        if len(bands) == 1:
+            return engine(processed_img)
+        
+        # Both backends run outside the GIL (a tesseract process, or tesserocr's
+        # nogil calls on a per-thread engine), so threads use several cores
+        results = list(self.band_pool.map(engine, [processed_img[top:bottom] for top, bottom in bands]))
+        
+        # Word boxes are relative to their band
+        for (top, _), band_lines in zip(bands, results):
+            for line in band_lines:
+                for word in line['words']:
+                    word['top'] += top
+        
+        lines = results[0]
+        for (_, previous_bottom), (top, _), band_lines in zip(bands, bands[1:], results[1:]):
+            # Bands only share rows where no blank gap was found; drop lines read twice
+            if top < previous_bottom:
+                repeated = self._repeated_lines([line['text'] for line in lines],
+                                                [line['text'] for line in band_lines])
+                band_lines = band_lines[repeated:]
+            lines += band_lines
+        return lines
+
+    def split_into_bands(self, binary: np.ndarray) -> List[Tuple[int, int]]:
+        """Row ranges for strip OCR, cut at blank rows near evenly spaced positions
+        
+        Returns a single band unless OCR_STRIPS allows more and the image is at
+        least OCR_STRIP_MIN_HEIGHT per band. A cut with no blank row nearby goes
+        through text, so the bands on both sides overlap by OCR_STRIP_OVERLAP.
+        """
+        h = binary.shape[0]
+        count = min(settings.OCR_STRIPS, h // settings.OCR_STRIP_MIN_HEIGHT)
+        if count <= 1:
+            return [(0, h)]
+        
+        # Text is black on white; tolerate a few specks per blank row
+        ink = np.count_nonzero(binary < 128, axis=1)
+        blank = ink <= binary.shape[1] // 200
+        window = h // (count * 4)
+        
+        cuts = [(0, True)]
+        for i in range(1, count):
+            target = h * i // count
+            low = max(cuts[-1][0] + 1, target - window)
+            candidates = np.flatnonzero(blank[low:target + window]) + low
+            if candidates.size:
+                # Cut in the middle of the gap nearest the target
+                row = int(candidates[np.argmin(np.abs(candidates - target))])
+                top = bottom = row
+                while top > 0 and blank[top - 1]:
+                    top -= 1
+                while bottom < h - 1 and blank[bottom + 1]:
+                    bottom += 1
+                cut = ((top + bottom) // 2, True)
+            else:
+                cut = (target, False)
+            # One tall gap can be nearest to several targets; keep its cut once
+            if cuts[-1][0] < cut[0] < h:
+                cuts.append(cut)
+        cuts.append((h, True))
+        if len(cuts) < 3:
+            return [(0, h)]
+        
+        overlap = settings.OCR_STRIP_OVERLAP
+        return [
+            (top if clean_top else max(0, top - overlap), bottom if clean_bottom else min(h, bottom + overlap))
+            for (top, clean_top), (bottom, clean_bottom) in zip(cuts, cuts[1:])
+        ]
+
+    def _repeated_lines(self, previous: List[str], following: List[str], max_lines: int = 3) -> int:
+        """How many leading lines of following repeat the last lines of previous"""
+        def normalized(line: str) -> str:
+            return ' '.join(line.split()).lower()
+        
+        for count in range(min(max_lines, len(previous), len(following)), 0, -1):
+            if all(SequenceMatcher(None, normalized(a), normalized(b)).ratio() >= 0.8
+                   for a, b in zip(previous[-count:], following[:count])):
+                return count
+        return 0
+
+    # OCR text fixes, applied in one pass each
+    _CHAR_FIXES = str.maketrans({"’": "'", "‘": "'", "°": "0", "~": "-"})
+    _NUMBER_FIX = re.compile(r"(\d)(?:/(\d)|\s+(\d{2}))")
+    # Splits a line into name fragments (even indices) and prices (odd indices)
+    _PRICE_SPLIT = re.compile(r"(-?\d+[.,]\d{2})")
+
+    def _clean_text(self, text: str) -> str:
+        """Fix common OCR mistakes in recognized text"""
+        # --- Post-processing cleanup ---
+        # Fix common OCR mistakes
+        text = text.translate(self._CHAR_FIXES)
+        # Fix 3/19 -> 3.19 and 1 38 -> 1.38
+        return self._NUMBER_FIX.sub(self._join_number, text)
+
+    @staticmethod
+    def _join_number(match: re.Match) -> str:
+        return f"{match.group(1)}.{match.group(2) or match.group(3)}"
     
     def extract_items_from_text(self, text: str) -> List[Dict]:
         """Extract items and prices from OCR text"""
-        lines = text.split('\n')
-        items = []
-        flag=False
-        temp_name=""
-        # Pattern to match price (numbers with . or , as decimal separator)
-        price_pattern = r'(-?\d+[.,]\d{2})'
-        row_number=0
+        with metrics.stage('parse'):
+            return list(self.iter_items_from_text(text))
+
+    def iter_items_from_text(self, text: str) -> Iterator[Dict]:
+        """Parse items from OCR text in a single pass over its lines
         
-        for line in lines:
+        A line with a price (numbers with . or , as decimal separator; the
+        last one wins) ends an item named by the rest of the line. After a
+        blank line, text lines without a price are collected and prefixed
+        to the next item's name.
+        """
+        after_blank = False
+        name_parts = []
+        row_number = 0
+        
+        for line in text.split('\n'):
             line = line.strip()
-            
             if not line:
-                flag=True
+                after_blank = True
                 continue
             
-            if not flag:
-                temp_name=""
-            temp_name+=line+" "
-            # Look for lines with prices
-            price_matches = re.findall(price_pattern, line)
+            if not after_blank:
+                name_parts.clear()
+            # One regex pass gives both the prices and the text around them
+            pieces = self._PRICE_SPLIT.split(line)
+            name_parts.append(''.join(pieces[::2]))
             
-            if price_matches:
-                # Get the price (last match usually)
-                price_str = price_matches[-1].replace(',', '.')
-                try:
-                    price = float(price_str)
-                
-                    # Extract item name (text before the price)
-                    item_text = re.sub(price_pattern, '', temp_name).strip()
-                    row_number+=1
-                    # Clean up item name
-                    item_text = re.sub(r'\s+', ' ', item_text)
-                    item_text = item_text.strip('.,- ')
-                    
-                    if len(item_text) > 1:  # Avoid very short meaningless text
-                        items.append({
-                            'row_number': row_number,
-                            'dutch_name': item_text,
-                            'english_name': '',
-                            'price': price,
-                            'quantity': 1,
-                            'category': 'Uncategorized'
-                        })
-                        temp_name=""
-                        flag=False
-                except ValueError:
-                    continue
+            if len(pieces) == 1:
+                continue
+            
+            row_number += 1
+            item_text = ' '.join(' '.join(name_parts).split()).strip('.,- ')
+            if len(item_text) > 1:  # Avoid very short meaningless text
+                yield {
+                    'row_number': row_number,
+                    'dutch_name': item_text,
+                    'english_name': '',
+                    'price': float(pieces[-2].replace(',', '.')),
+                    'quantity': 1,
+                    'category': 'Uncategorized'
+                }
+                name_parts.clear()
+                after_blank = False
+
+    _PRICE_WORD = re.compile(r'^-?\d+[.,/]\d{2}$')
+    # Quantity and unit price left of a line's price ("2 X 0,35", "0,535 KG x 2,99"): not a name
+    _QUANTITY_TEXT = re.compile(
+        r'^\d+(?:[.,]\d+)?\s*(?:KG|G|ST|STK)?\s*[xX*@]\s*(?:-?\d+[.,/]\d{2})?\s*(?:/\s*)?(?:KG|ST|STK)?$',
+        re.IGNORECASE
+    )
+
+    def extract_items_from_words(self, lines: List[Dict]) -> List[Dict]:
+        """Extract items from word-level OCR lines (run_ocr with word_boxes)
+        
+        Prices are taken only from the receipt's price column: the largest
+        group of right-aligned price words. A priced line without a name of
+        its own, or only a quantity and unit price (e.g. "2 * 4,99   9,98"),
+        is named by the line above it.
+        Each item keeps the lowest confidence of the words it was built
+        from, and is flagged for review below ITEM_REVIEW_CONFIDENCE.
+        """
+        with metrics.stage('parse'):
+            return self._items_from_words(lines)
+
+    def _items_from_words(self, lines: List[Dict]) -> List[Dict]:
+        """Price-column item extraction behind extract_items_from_words"""
+        rows = [self._merge_split_prices(sorted(line['words'], key=lambda w: w['left'])) for line in lines]
+        prices = [word for words in rows for word in words if self._PRICE_WORD.match(word['text'])]
+        if not prices:
+            return []
+        
+        # Right edges within about a character of each other form one column
+        tolerance = 1.5 * float(np.median([word['height'] for word in prices]))
+        edges = sorted(word['left'] + word['width'] for word in prices)
+        groups = [[edges[0]]]
+        for edge in edges[1:]:
+            if edge - groups[-1][-1] <= tolerance:
+                groups[-1].append(edge)
+            else:
+                groups.append([edge])
+        column = float(np.median(max(groups, key=lambda group: (len(group), group[-1]))))
+        
+        items = []
+        row_number = 0
+        previous = []
+        for words in rows:
+            price_word = next((
+                word for word in reversed(words)
+                if self._PRICE_WORD.match(word['text']) and abs(word['left'] + word['width'] - column) <= tolerance
+            ), None)
+            if price_word is None:
+                if words:
+                    previous = words
+                continue
+            
+            name_words = [word for word in words if word['left'] + word['width'] <= price_word['left']]
+            name_text = ' '.join(word['text'] for word in name_words)
+            if not any(char.isalpha() for char in name_text) or self._QUANTITY_TEXT.match(name_text):
+                name_words = [word for word in previous if word['left'] + word['width'] <= price_word['left']]
+            previous = []
+            
+            item_text = self._clean_text(' '.join(word['text'] for word in name_words)).strip('.,- ')
+            try:
+                price = float(re.sub(r'[,/]', '.', price_word['text']))
+            except ValueError:
+                continue
+            row_number += 1
+            
+            if len(item_text) > 1:  # Avoid very short meaningless text
+                confidence = min(word['conf'] for word in name_words + [price_word])
+                items.append({
+                    'row_number': row_number,
+                    'dutch_name': item_text,
+                    'english_name': '',
+                    'price': price,
+                    'quantity': 1,
+                    'category': 'Uncategorized',
+                    'confidence': round(confidence, 1),
+                    'needs_review': confidence < settings.ITEM_REVIEW_CONFIDENCE,
+                })
         
         return items
+
+    def _merge_split_prices(self, words: List[Dict]) -> List[Dict]:
+        """Join prices OCR'd as two words ("1 19" -> "1.19") when the gap is narrow"""
+        merged = []
+        for word in words:
+            if merged and re.fullmatch(r'\d{2}', word['text']) and re.fullmatch(r'-?\d+', merged[-1]['text']):
+                left = merged[-1]
+                if word['left'] - (left['left'] + left['width']) <= left['height']:
+                    merged[-1] = {
+                        'text': f"{left['text']}.{word['text']}",
+                        'conf': min(left['conf'], word['conf']),
+                        'left': left['left'], 'top': min(left['top'], word['top']),
+                        'width': word['left'] + word['width'] - left['left'],
+                        'height': max(left['height'], word['height']),
+                    }
+                    continue
+            merged.append(word)
+        return merged
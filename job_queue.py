@@ -0,0 +1,222 @@
+# job_queue.py
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+
+class JobQueue:
+    """Durable SQLite-backed queue of receipt images submitted as batch jobs
+
+    A job is a set of images; every image is a task that worker processes
+    claim, process and complete independently. Claims are atomic across
+    processes, and tasks left running by a crashed worker are retried once
+    they are older than ``JOB_STALE_AFTER``.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.JOB_QUEUE_DB
+        self.conn = None
+        self._lock = threading.Lock()
+        self.init_database()
+
+    def init_database(self):
+        """Create the job tables"""
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                profile TEXT,
+                extraction TEXT,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS job_tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL REFERENCES jobs (id),
+                position INTEGER NOT NULL,
+                filename TEXT,
+                image BLOB,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_job_tasks_status ON job_tasks(status, id)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_job_tasks_job ON job_tasks(job_id, position)')
+        self.conn.commit()
+
+    def submit(self, images: List[Tuple[str, bytes]], profile: str = None, extraction: str = None) -> str:
+        """Queue (filename, image bytes) pairs as one job and return its id"""
+        job_id = uuid.uuid4().hex
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO jobs (id, profile, extraction, total, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, profile, extraction, len(images), time.time())
+            )
+            self.conn.executemany(
+                'INSERT INTO job_tasks (job_id, position, filename, image) VALUES (?, ?, ?, ?)',
+                [(job_id, position, filename, data) for position, (filename, data) in enumerate(images)]
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict]:
+        """Take the oldest queued task, or None when the queue is empty"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            # IMMEDIATE takes the write lock up front, so two workers never claim the same task
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                # Tasks of workers that died mid-image go back to the queue (or give up)
+                stale_before = time.time() - settings.JOB_STALE_AFTER
+                cursor.execute('''
+                    UPDATE job_tasks SET
+                        status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                        error = 'Worker stopped while processing the image'
+                    WHERE status = 'running' AND claimed_at < ?
+                ''', (settings.JOB_MAX_ATTEMPTS, stale_before))
+                row = cursor.execute('''
+                    SELECT t.id, t.job_id, t.position, t.filename, t.image, j.profile, j.extraction
+                    FROM job_tasks t
+                    JOIN jobs j ON j.id = t.job_id
+                    WHERE t.status = 'queued'
+                    ORDER BY t.id
+                    LIMIT 1
+                ''').fetchone()
+                if row:
+                    cursor.execute('''
+                        UPDATE job_tasks SET status = 'running', attempts = attempts + 1, claimed_at = ?
+                        WHERE id = ?
+                    ''', (time.time(), row[0]))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+        if row is None:
+            return None
+        task_id, job_id, position, filename, image, profile, extraction = row
+        return {
+            'id': task_id, 'job_id': job_id, 'position': position, 'filename': filename,
+            'image': image, 'profile': profile, 'extraction': extraction,
+        }
+
+    def complete(self, task_id: int, result: Dict):
+        """Store a task's result and drop its image"""
+        with self._lock, self.conn:
+            self.conn.execute('''
+                UPDATE job_tasks SET status = 'done', result = ?, error = NULL, image = NULL, finished_at = ?
+                WHERE id = ?
+            ''', (json.dumps(result), time.time(), task_id))
+
+    def fail(self, task_id: int, error: str, retry: bool = True):
+        """Record a failed attempt; the task is retried until JOB_MAX_ATTEMPTS
+
+        retry=False fails the task right away, for errors another attempt
+        cannot fix (e.g. an image that does not decode).
+        """
+        max_attempts = settings.JOB_MAX_ATTEMPTS if retry else 0
+        with self._lock, self.conn:
+            self.conn.execute('''
+                UPDATE job_tasks SET
+                    status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                    image = CASE WHEN attempts < ? THEN image END,
+                    finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END,
+                    error = ?
+                WHERE id = ?
+            ''', (max_attempts, max_attempts, max_attempts, time.time(), error, task_id))
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Job status with the results of the images finished so far, or None"""
+        with self._lock:
+            job = self.conn.execute(
+                'SELECT total, created_at FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            tasks = self.conn.execute('''
+                SELECT position, filename, status, result, error
+                FROM job_tasks WHERE job_id = ? ORDER BY position
+            ''', (job_id,)).fetchall()
+
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        results = []
+        for position, filename, status, result, error in tasks:
+            counts[status] += 1
+            entry = {'position': position, 'filename': filename, 'status': status}
+            if status == 'done':
+                entry.update(json.loads(result))
+            elif status == 'failed':
+                entry['error'] = error
+            results.append(entry)
+
+        if counts['done'] + counts['failed'] == job[0]:
+            status = 'done'
+        elif counts['queued'] == job[0]:
+            status = 'queued'
+        else:
+            status = 'running'
+        return {'job_id': job_id, 'status': status, 'total': job[0], 'created_at': job[1],
+                **counts, 'results': results}
+
+    def pending_count(self) -> int:
+        """Tasks queued or running across all jobs"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM job_tasks WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    def purge(self, older_than: float = None) -> int:
+        """Delete jobs created more than older_than seconds ago; returns the count"""
+        cutoff = time.time() - (settings.JOB_RETENTION if older_than is None else older_than)
+        with self._lock, self.conn:
+            stale = [row[0] for row in self.conn.execute('SELECT id FROM jobs WHERE created_at < ?', (cutoff,))]
+            self.conn.executemany('DELETE FROM job_tasks WHERE job_id = ?', [(job_id,) for job_id in stale])
+            self.conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in stale])
+        return len(stale)
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.close()
+
+
+def run_job_worker(db_path: str = None, stop_event=None):
+    """Process queued job tasks until stop_event is set (runs in its own process)"""
+    from pipeline import init_worker, process_image_bytes
+    from translator import TranslationService
+
+    init_worker(warm=True)
+    queue = JobQueue(db_path)
+    translator = TranslationService()
+    try:
+        while stop_event is None or not stop_event.is_set():
+            task = queue.claim()
+            if task is None:
+                time.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+            try:
+                result = process_image_bytes(task['image'], task['profile'], task['extraction'])
+                result['items'] = translator.translate_items(result['items'])
+                result.pop('text', None)
+                result.pop('timings', None)
+                queue.complete(task['id'], result)
+            except ValueError as e:
+                # Undecodable image or unknown option: every attempt would fail the same way
+                queue.fail(task['id'], str(e), retry=False)
+            except Exception as e:
+                queue.fail(task['id'], str(e))
+    finally:
+        queue.close()
+
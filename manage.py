@@ -0,0 +1,279 @@
+# manage.py
+"""
+Command line tools for bulk receipt processing
+
+    python -m manage ingest receipts/ "scans/*.jpg" --store "Albert Heijn"
+    python -m manage reprocess
+    python -m manage work-jobs --workers 4
+    python -m manage rebuild-rollups
+    python -m manage export receipts.csv --store "Albert Heijn" --from 2024-01-01
+"""
+import argparse
+import fnmatch
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from config import settings
+from data_manager import DataManager
+from database import DatabaseManager
+from image_processor import ImageProcessor, available_profiles
+from job_queue import run_job_worker
+import metrics
+from pipeline import EXTRACTION_MODES, init_worker, process_image_file
+from translation_memory import TranslationMemory
+from translator import TranslationService
+from utils.helpers import image_hash
+
+
+def collect_images(sources: List[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of image files"""
+    patterns = [pattern.lower() for pattern in settings.SUPPORTED_FORMATS]
+
+    def is_image(path: str) -> bool:
+        name = os.path.basename(path).lower()
+        return os.path.isfile(path) and any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                paths.update(os.path.join(root, name) for name in files)
+        else:
+            paths.update(glob.glob(source, recursive=True))
+    return sorted(path for path in paths if is_image(path))
+
+
+def file_date(path: str) -> str:
+    """Receipt date fallback: the file's modification date"""
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+
+
+def ingest(args) -> int:
+    """OCR a set of receipt images in parallel and store them in the database"""
+    started = time.perf_counter()
+    db = DatabaseManager(args.db)
+    memory = TranslationMemory(args.db) if settings.TRANSLATION_MEMORY_ENABLED else None
+    translator = TranslationService(memory=memory)
+
+    paths = collect_images(args.sources)
+    seen = db.get_ingested_hashes()
+    todo = []
+    skipped = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest = image_hash(f.read())
+        if digest in seen and not args.force:
+            skipped += 1
+            continue
+        seen.add(digest)
+        todo.append((path, digest))
+
+    print(f"Found {len(paths)} images: {len(todo)} to process, {skipped} already ingested")
+
+    done = failed = item_count = 0
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker) as executor:
+        # Work in batches so an interrupted run keeps everything stored so far
+        for start in range(0, len(todo), args.batch_size):
+            batch = todo[start:start + args.batch_size]
+            futures = {executor.submit(process_image_file, path, args.profile, args.extraction): (path, digest) for path, digest in batch}
+            results: List[Dict] = []
+
+            for future in as_completed(futures):
+                path, digest = futures[future]
+                done += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[{done}/{len(todo)}] FAILED {path}: {e}", file=sys.stderr)
+                    continue
+                metrics.observe(result['timings'])
+                results.append({'path': path, 'image_hash': digest, 'items': result['items'], 'text': result['text']})
+                print(f"[{done}/{len(todo)}] {path}: {len(result['items'])} items")
+
+            # Translate every distinct item name of the batch once
+            translator.translate_items([item for result in results for item in result['items']])
+
+            db.save_receipts([{
+                'store_name': args.store,
+                'date': args.date or file_date(result['path']),
+                'items': result['items'],
+                'image_hash': result['image_hash'],
+                'ocr_text': result['text'],
+                'extraction': args.extraction,
+            } for result in results])
+            item_count += sum(len(result['items']) for result in results)
+
+    db.close()
+
+    elapsed = time.perf_counter() - started
+    processed = done - failed
+    rate = processed / elapsed if elapsed else 0.0
+    print(
+        f"Ingested {processed} receipts ({item_count} items) in {elapsed:.1f}s "
+        f"- {rate:.2f} images/sec, {failed} failed, {skipped} skipped"
+    )
+    if processed:
+        print("Time per stage (summed over workers):\n" + metrics.stage_summary())
+    return 1 if failed else 0
+
+
+def reprocess(args) -> int:
+    """Re-parse and re-translate stored OCR text without running OCR again
+
+    Receipts saved from the Process tab are skipped, and items that are
+    re-parsed unchanged (same Dutch name and price) keep their stored
+    English name and category; --overwrite-edits re-parses everything.
+    Rollups are updated batch by batch.
+    """
+    started = time.perf_counter()
+    db = DatabaseManager(args.db)
+    memory = TranslationMemory(args.db) if settings.TRANSLATION_MEMORY_ENABLED else None
+    translator = TranslationService(memory=memory) if args.translate else None
+    processor = ImageProcessor()
+
+    receipt_count = item_count = 0
+    after_id = 0
+    while True:
+        page = db.get_receipt_texts(after_id, args.batch_size, store_name=args.store,
+                                    include_manual=args.overwrite_edits)
+        if not page:
+            break
+        after_id = page[-1][0]
+
+        batch = [(receipt_id, processor.extract_items_from_text(text)) for receipt_id, text in page]
+        if not args.overwrite_edits:
+            previous = db.get_receipt_items([receipt_id for receipt_id, _ in batch])
+            for receipt_id, items in batch:
+                keep_labels(items, previous[receipt_id])
+
+        if translator:
+            # Translate every distinct item name of the batch once
+            translator.translate_items([item for _, items in batch for item in items])
+        else:
+            for _, items in batch:
+                for item in items:
+                    item['english_name'] = item['english_name'] or item['dutch_name']
+
+        db.replace_receipt_items(batch)
+        receipt_count += len(batch)
+        item_count += sum(len(items) for _, items in batch)
+        print(f"{receipt_count} receipts re-parsed")
+
+    db.close()
+    print(f"Re-parsed {receipt_count} receipts ({item_count} items) in {time.perf_counter() - started:.1f}s")
+    if receipt_count:
+        print("Time per stage:\n" + metrics.stage_summary())
+    return 0
+
+
+def keep_labels(items: List[Dict], previous: List[Tuple[str, float, str, str]]):
+    """Copy English name and category from previous rows with the same Dutch name and price"""
+    labels = {}
+    for dutch_name, price, english_name, category in previous:
+        labels.setdefault((dutch_name, round(price, 2)), []).append((english_name, category))
+    for item in items:
+        matches = labels.get((item['dutch_name'], round(item['price'], 2)))
+        if matches:
+            item['english_name'], item['category'] = matches.pop(0)
+
+
+def work_jobs(args) -> int:
+    """Drain the /v1/jobs queue with worker processes until interrupted"""
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    workers = [context.Process(target=run_job_worker, args=(args.queue, stop_event)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    print(f"{len(workers)} job workers draining {args.queue or settings.JOB_QUEUE_DB}; Ctrl+C to stop")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Workers finish the image they are on; unfinished claims are retried later
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+    return 0
+
+
+def rebuild_rollups(args) -> int:
+    """Recompute the analytics rollup tables from scratch"""
+    started = time.perf_counter()
+    db = DatabaseManager(args.db)
+    db.rebuild_rollups()
+    db.close()
+    print(f"Rebuilt analytics rollups in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def export(args) -> int:
+    """Stream receipt items to an .xlsx, .csv or .parquet file"""
+    started = time.perf_counter()
+    db = DatabaseManager(args.db)
+    rows = db.iter_receipts_with_items(store_name=args.store, date_from=args.date_from, date_to=args.date_to)
+    count = DataManager.export_receipts(rows, args.file)
+    db.close()
+    print(f"Exported {count} rows to {args.file} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m manage", description=settings.APP_NAME)
+    parser.add_argument("--db", default=settings.DATABASE_NAME, help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="OCR and store a directory or glob of receipt images")
+    ingest_parser.add_argument("sources", nargs="+", help="image files, directories or glob patterns")
+    ingest_parser.add_argument("--store", default="Unknown Store", help="store name for all receipts")
+    ingest_parser.add_argument("--date", help="receipt date (YYYY-MM-DD); defaults to each file's mtime")
+    ingest_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="OCR worker processes")
+    ingest_parser.add_argument("--batch-size", type=int, default=50, help="images translated and saved together")
+    ingest_parser.add_argument("--profile", choices=available_profiles(), default=settings.PREPROCESS_PROFILE,
+                               help="image preprocessing profile")
+    ingest_parser.add_argument("--extraction", choices=EXTRACTION_MODES, default=settings.ITEM_EXTRACTION,
+                               help="parse items from the OCR text or from word boxes")
+    ingest_parser.add_argument("--force", action="store_true", help="re-ingest images already in the database")
+    ingest_parser.set_defaults(func=ingest)
+
+    reprocess_parser = commands.add_parser("reprocess", help="re-parse items from stored OCR text (no OCR)")
+    reprocess_parser.add_argument("--store", help="only receipts of this store")
+    reprocess_parser.add_argument("--overwrite-edits", action="store_true",
+                                  help="also re-parse receipts saved from the GUI and replace edited names and categories")
+    reprocess_parser.add_argument("--batch-size", type=int, default=500, help="receipts parsed and saved together")
+    reprocess_parser.add_argument("--no-translate", dest="translate", action="store_false",
+                                  help="keep Dutch names instead of translating")
+    reprocess_parser.set_defaults(func=reprocess)
+
+    jobs_parser = commands.add_parser("work-jobs", help="process images queued through POST /v1/jobs")
+    jobs_parser.add_argument("--queue", help=f"job queue database (default: {settings.JOB_QUEUE_DB})")
+    jobs_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    jobs_parser.set_defaults(func=work_jobs)
+
+    rollups_parser = commands.add_parser("rebuild-rollups", help="recompute the analytics rollup tables")
+    rollups_parser.set_defaults(func=rebuild_rollups)
+
+    export_parser = commands.add_parser("export", help="export receipt items to .xlsx, .csv or .parquet")
+    export_parser.add_argument("file", help="output file; the format follows the extension")
+    export_parser.add_argument("--store", help="only this store")
+    export_parser.add_argument("--from", dest="date_from", help="first date (YYYY-MM-DD)")
+    export_parser.add_argument("--to", dest="date_to", help="last date (YYYY-MM-DD)")
+    export_parser.set_defaults(func=export)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
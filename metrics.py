@@ -0,0 +1,217 @@
+# metrics.py
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# Seconds; OCR of a phone photo lands in the 0.5-5s buckets, parsing well below 10ms
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ITEM_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    """Prometheus label set, e.g. {stage="ocr",le="0.5"}"""
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {value:g}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def summary(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """(count, sum) per label set"""
+        with self._lock:
+            return {key: (int(sum(series[:-1])), series[-1]) for key, series in self.values.items()}
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = {key: list(series) for key, series in self.values.items()}
+        for key, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]:g}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}"
+
+
+class Callback:
+    """Counter or gauge read from a function at scrape time (e.g. queue depth)"""
+
+    def __init__(self, name: str, help: str, kind: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                 labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = labels
+        self.fn = fn
+
+    def samples(self) -> Iterator[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            # A closed database etc. must not break the whole scrape
+            return
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {value:g}"
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Re-registering (e.g. the web app reloaded) replaces the old metric
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = STAGE_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, kind: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                 labels: Tuple[str, ...] = ()) -> Callback:
+        return self.register(Callback(name, help, kind, fn, labels))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'receipt_stage_seconds', 'Time spent in each pipeline stage', ('stage',)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'receipt_errors_total', 'Failures by pipeline stage', ('stage',)
+)
+ITEMS_PER_RECEIPT = REGISTRY.histogram(
+    'receipt_items', 'Items extracted per receipt', buckets=ITEM_BUCKETS
+)
+
+# Stage timings of the current collect() block, if any
+_collected: contextvars.ContextVar = contextvars.ContextVar('stage_timings', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into STAGE_SECONDS (and any collect() in progress)
+
+    Exceptions are counted in STAGE_ERRORS and re-raised.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _collected.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def collect():
+    """Gather {stage: seconds} for the stages run inside the block
+
+    Worker processes keep their own registry, so the pipeline returns
+    these timings with its result for the parent to observe(). A nested
+    block shares the outermost block's dict.
+    """
+    timings = _collected.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = {}
+    token = _collected.set(timings)
+    try:
+        yield timings
+    finally:
+        _collected.reset(token)
+
+
+def observe(timings: Dict[str, float]):
+    """Record stage timings collected in another process"""
+    for name, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def stage_summary() -> str:
+    """Per-stage count, total and mean time, one line per stage (for CLI output)"""
+    rows = sorted(STAGE_SECONDS.summary().items(), key=lambda row: -row[1][1])
+    return '\n'.join(
+        f"  {key[0]:<10} {count:>6}x  {total:8.2f}s total  {total / count * 1000:8.1f}ms mean"
+        for key, (count, total) in rows if count
+    )
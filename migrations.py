@@ -0,0 +1,115 @@
+# migrations.py
+"""
+Versioned schema migrations for the receipts database
+
+The schema version is stored in ``PRAGMA user_version``. Each migration
+runs in its own transaction together with the version bump, so a failed
+migration leaves the database at the previous version.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+
+def _add_image_hash(cursor: sqlite3.Cursor):
+    """Receipt image hash, used to skip already ingested files"""
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(receipts)')]
+    if 'image_hash' not in columns:
+        cursor.execute('ALTER TABLE receipts ADD COLUMN image_hash TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_receipts_image_hash ON receipts(image_hash)')
+
+
+def _add_query_indexes(cursor: sqlite3.Cursor):
+    """Indexes for the receipt/item join and the View Data filters"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_receipt_id ON items(receipt_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_receipts_date ON receipts(date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_receipts_store_date ON receipts(store_name, date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_category ON items(category)')
+
+
+def _add_rollup_tables(cursor: sqlite3.Cursor):
+    """Per store/month and per category/month totals for the analytics tab"""
+    # '' stands in for a missing store/category or an unparseable date
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS store_month_totals (
+            store_name TEXT NOT NULL,
+            month TEXT NOT NULL,
+            total_amount REAL NOT NULL DEFAULT 0,
+            receipt_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (store_name, month)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS category_month_totals (
+            category TEXT NOT NULL,
+            month TEXT NOT NULL,
+            total_amount REAL NOT NULL DEFAULT 0,
+            item_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category, month)
+        )
+    ''')
+
+    # Backfill from existing receipts
+    cursor.execute('''
+        INSERT INTO store_month_totals (store_name, month, total_amount, receipt_count)
+        SELECT IFNULL(store_name, ''), IFNULL(strftime('%Y-%m', date), ''), SUM(total_amount), COUNT(*)
+        FROM receipts
+        GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO category_month_totals (category, month, total_amount, item_count)
+        SELECT IFNULL(i.category, ''), IFNULL(strftime('%Y-%m', r.date), ''), SUM(i.price * i.quantity), COUNT(*)
+        FROM items i
+        JOIN receipts r ON r.id = i.receipt_id
+        GROUP BY 1, 2
+    ''')
+
+
+def _add_ocr_text(cursor: sqlite3.Cursor):
+    """Raw OCR text per receipt (zlib-compressed), so items can be re-parsed without OCR"""
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(receipts)')]
+    if 'ocr_text' not in columns:
+        cursor.execute('ALTER TABLE receipts ADD COLUMN ocr_text BLOB')
+
+
+def _add_extraction(cursor: sqlite3.Cursor):
+    """How a receipt's items were extracted (NULL: from the OCR text)"""
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(receipts)')]
+    if 'extraction' not in columns:
+        cursor.execute('ALTER TABLE receipts ADD COLUMN extraction TEXT')
+
+
+# (version, description, migration) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, 'receipt image hash', _add_image_hash),
+    (2, 'indexes for filters and joins', _add_query_indexes),
+    (3, 'analytics rollup tables', _add_rollup_tables),
+    (4, 'raw OCR text', _add_ocr_text),
+    (5, 'item extraction mode', _add_extraction),
+]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Current schema version of the database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply all pending migrations and return the resulting schema version"""
+    version = get_version(conn)
+
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN')
+            apply(cursor)
+            cursor.execute(f'PRAGMA user_version = {target}')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Database migration {target} ({description}) failed: {str(e)}")
+        version = target
+
+    return version
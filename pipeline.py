@@ -0,0 +1,149 @@
+# pipeline.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+import metrics
+from config import settings
+from image_processor import ImageProcessor
+
+# Item extraction modes: regex over the OCR text, or word boxes with confidences
+EXTRACTION_MODES = ('text', 'words')
+
+# Per-process ImageProcessor, created once by init_worker()
+_processor: Optional[ImageProcessor] = None
+
+
+def init_worker(warm: bool = False):
+    """Create the warm ImageProcessor used by this pool worker"""
+    global _processor
+    _processor = ImageProcessor()
+    # Load the OCR engine now rather than on the worker's first image
+    _processor.ocr_backend
+    if warm:
+        warm_up(_processor)
+
+
+def warm_up(processor: ImageProcessor):
+    """Run the whole pipeline once on the bundled sample receipt"""
+    # Tesseract's language data and OpenCV's code paths load on first use
+    if not settings.WARMUP_IMAGE:
+        return
+    try:
+        _extract(processor, processor.load_image(settings.WARMUP_IMAGE), None, None)
+    except Exception as e:
+        print(f"Pipeline warm-up failed: {e}")
+
+
+def worker_ready() -> int:
+    """Pid of the pool worker running this (used to wait for warm-up)"""
+    # Linger so each idle worker picks up one of the probes
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def process_image_bytes(data: bytes, profile: str = None, extraction: str = None) -> Dict:
+    """Run OCR and item extraction for one encoded image (executes in a pool worker)"""
+    processor = _processor or ImageProcessor()
+    return _extract(processor, data, profile, extraction)
+
+
+def process_image_file(image_path: str, profile: str = None, extraction: str = None) -> Dict:
+    """Run OCR and item extraction for one image file (executes in a pool worker)"""
+    processor = _processor or ImageProcessor()
+    # Collect here so reading the file counts towards the result's timings
+    with metrics.collect():
+        return _extract(processor, processor.load_image(image_path), profile, extraction)
+
+
+def _extract(processor: ImageProcessor, image, profile: Optional[str], extraction: Optional[str]) -> Dict:
+    """OCR an image and parse its items from the text or from word boxes
+
+    The result's 'timings' ({stage: seconds}) let the calling process
+    record stages that ran in a pool worker.
+    """
+    extraction = extraction or settings.ITEM_EXTRACTION
+    if extraction not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown item extraction mode: {extraction}")
+    
+    with metrics.collect() as timings:
+        result = processor.run_ocr(image, profile, word_boxes=extraction == 'words')
+        if extraction == 'words':
+            result['items'] = processor.extract_items_from_words(result.pop('lines'))
+        else:
+            result['items'] = processor.extract_items_from_text(result['text'])
+    result['timings'] = timings
+    return result
+
+
+class PipelineBusyError(Exception):
+    """Raised when the OCR worker pool cannot accept more work"""
+
+
+class OCRWorkerPool:
+    """Bounded process pool that keeps CPU-bound OCR off the event loop"""
+
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        self.max_workers = max_workers or settings.OCR_WORKERS
+        self.max_pending = max_pending or settings.OCR_MAX_PENDING
+        self.pending = 0
+        self._executor = None
+
+    def start(self):
+        """Start the worker processes"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(True,),
+            )
+
+    async def warm_up(self, timeout: float = None):
+        """Start every worker and wait until each has run its warm-up"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        ready = set()
+
+        async def probe():
+            # Workers answer only once their initializer (the warm-up) is done
+            while len(ready) < self.max_workers:
+                probes = [loop.run_in_executor(self._executor, worker_ready) for _ in range(self.max_workers)]
+                ready.update(await asyncio.gather(*probes))
+
+        try:
+            await asyncio.wait_for(probe(), timeout or settings.WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"OCR pool warm-up timed out ({len(ready)}/{self.max_workers} workers ready)")
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, fn, *args):
+        """Run fn(*args) in a worker, rejecting the call if the queue is full"""
+        if self.pending >= self.max_pending:
+            raise PipelineBusyError(
+                f"OCR queue is full ({self.pending}/{self.max_pending} jobs pending)"
+            )
+
+        self.start()
+        executor = self._executor
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); replace the pool so later requests work
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False)
+            raise
+        finally:
+            self.pending -= 1
@@ -0,0 +1,146 @@
+# result_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from config import settings
+from utils.helpers import LRUCache
+
+# Bump when preprocessing, OCR or item extraction code changes its output,
+# so results cached by an older build are not served
+CACHE_VERSION = 2
+
+
+class ResultCache:
+    """Caches OCR text + extracted items keyed on image content and OCR config
+
+    Lookups go to an in-process LRU first and then, if configured, to an
+    on-disk SQLite tier that is trimmed to ``max_db_bytes`` (least recently
+    used entries are evicted first).
+    """
+
+    def __init__(self, max_entries: int = None, db_path: str = None, max_db_bytes: int = None):
+        self.memory = LRUCache(settings.RESULT_CACHE_SIZE if max_entries is None else max_entries)
+        self.db_path = db_path if db_path is not None else settings.RESULT_CACHE_DB
+        self.max_db_bytes = max_db_bytes or settings.RESULT_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        self.db_bytes = 0
+        self._lock = threading.Lock()
+
+        if self.db_path:
+            self.init_database()
+
+    def init_database(self):
+        """Create the on-disk cache table"""
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS result_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_result_cache_accessed ON result_cache(accessed_at)'
+        )
+        self.conn.commit()
+        # Kept up to date by put() so eviction does not re-sum the table
+        self.db_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM result_cache').fetchone()[0]
+
+    @staticmethod
+    def config_fingerprint() -> bytes:
+        """Cache version plus the settings that change OCR output"""
+        config = [
+            CACHE_VERSION, settings.OCR_LANGUAGES, settings.TESSERACT_CONFIG, settings.OCR_ENGINE,
+            settings.OCR_STRIPS, settings.OCR_STRIP_MIN_HEIGHT, settings.OCR_STRIP_OVERLAP,
+            settings.RECEIPT_DETECTION, settings.RECEIPT_MIN_AREA, settings.MAX_IMAGE_SIZE,
+            settings.IMAGE_SCALE_PROFILES, settings.PREPROCESS_PROFILES, settings.PREPROCESS_AUTO_ORDER,
+            settings.PREPROCESS_AUTO_MIN_CONFIDENCE, settings.DESKEW_MAX_ANGLE, settings.ITEM_REVIEW_CONFIDENCE,
+        ]
+        return json.dumps(config, sort_keys=True, default=str).encode()
+
+    @staticmethod
+    def make_key(data: bytes, profile: str = None, extraction: str = None) -> str:
+        """Hash the image bytes together with everything that changes OCR output"""
+        digest = hashlib.sha256()
+        digest.update(ResultCache.config_fingerprint())
+        digest.update(b'\0')
+        digest.update((profile or settings.PREPROCESS_PROFILE).encode())
+        digest.update(b'\0')
+        digest.update((extraction or settings.ITEM_EXTRACTION).encode())
+        digest.update(b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a fresh copy of the cached result, or None"""
+        value = self.memory.get(key)
+
+        if value is None and self.conn is not None:
+            with self._lock:
+                row = self.conn.execute(
+                    'SELECT value FROM result_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row:
+                    self.conn.execute(
+                        'UPDATE result_cache SET accessed_at = ? WHERE key = ?', (time.time(), key)
+                    )
+                    self.conn.commit()
+            if row:
+                value = row[0]
+                self.memory.put(key, value)
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        # Stored serialized so callers can mutate the result (e.g. translation)
+        return json.loads(value)
+
+    def put(self, key: str, result: Dict):
+        """Store a result in every configured tier"""
+        value = json.dumps(result)
+        self.memory.put(key, value)
+
+        if self.conn is not None:
+            with self._lock:
+                replaced = self.conn.execute(
+                    'SELECT size FROM result_cache WHERE key = ?', (key,)
+                ).fetchone()
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO result_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, value, len(value), time.time())
+                )
+                self.db_bytes += len(value) - (replaced[0] if replaced else 0)
+                if self.db_bytes > self.max_db_bytes:
+                    self._evict()
+                self.conn.commit()
+
+    def _evict(self):
+        """Trim the on-disk tier to max_db_bytes, oldest access first"""
+        excess = self.db_bytes - self.max_db_bytes
+        stale = []
+        for key, size in self.conn.execute('SELECT key, size FROM result_cache ORDER BY accessed_at'):
+            stale.append((key,))
+            excess -= size
+            self.db_bytes -= size
+            if excess <= 0:
+                break
+        self.conn.executemany('DELETE FROM result_cache WHERE key = ?', stale)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters"""
+        return {'hits': self.hits, 'misses': self.misses, 'memory_entries': len(self.memory)}
+
+    def close(self):
+        """Close the on-disk tier"""
+        if self.conn:
+            self.conn.close()
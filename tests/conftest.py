@@ -0,0 +1,59 @@
+from concurrent.futures import Executor, Future
+
+import pytest
+
+
+class StubExecutor(Executor):
+    """In-process stand-in for the OCR process pool
+
+    Calls run immediately, or wait in ``held`` until the test resolves
+    their futures when ``hold`` is set.
+    """
+
+    def __init__(self, hold=False, **kwargs):
+        self.hold = hold
+        self.held = []
+        self.calls = 0
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls += 1
+        future = Future()
+        if self.hold:
+            self.held.append((future, fn, args))
+        else:
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, **kwargs):
+        self.shut_down = True
+
+
+@pytest.fixture
+def stub_executor():
+    return StubExecutor()
+
+
+@pytest.fixture
+def webapp(tmp_path, monkeypatch, stub_executor):
+    """webapp.main with temporary databases, no warm-up or job workers and an in-process OCR pool"""
+    from config import settings
+    from result_cache import ResultCache
+    import webapp.main as main
+
+    monkeypatch.setattr(settings, 'JOB_WORKERS', 0)
+    monkeypatch.setattr(settings, 'JOB_QUEUE_DB', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(settings, 'TRANSLATION_BACKEND', 'offline')
+    monkeypatch.setattr(settings, 'TRANSLATION_MEMORY_DB', str(tmp_path / 'memory.db'))
+    monkeypatch.setattr(main, 'result_cache', ResultCache(max_entries=0, db_path=''))
+
+    async def no_warm_up(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(main.ocr_pool, 'warm_up', no_warm_up)
+    monkeypatch.setattr(main.ocr_pool, '_executor', stub_executor)
+    monkeypatch.setattr(main.ocr_pool, 'pending', 0)
+    return main
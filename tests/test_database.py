@@ -0,0 +1,250 @@
+import argparse
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import manage
+from database import DatabaseManager
+from migrations import MIGRATIONS, get_version, migrate
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / 'receipts.db'))
+    yield manager
+    manager.close()
+
+
+def make_item(row_number, dutch_name, price, english_name='', category='Uncategorized'):
+    return {'row_number': row_number, 'dutch_name': dutch_name, 'english_name': english_name,
+            'price': price, 'quantity': 1, 'category': category}
+
+
+def reprocess_args(db, **overrides):
+    args = dict(db=db.db_name, store=None, batch_size=500, translate=False, overwrite_edits=False)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_reprocess_keeps_edits_of_unchanged_items(db):
+    text = "MELK   1,19\nKAAS   4,50\nBROOD   2,10\n"
+    receipt_id = db.save_receipt("Jumbo", "2024-01-05", [
+        make_item(1, "MELK", 1.19, "Milk", "Dairy"),
+        make_item(2, "KAAS", 4.99, "Cheese", "Dairy"),  # price was misread at the time
+    ], ocr_text=text)
+    words_id = db.save_receipts([{
+        'store_name': "Jumbo", 'date': "2024-01-06", 'ocr_text': text, 'extraction': 'words',
+        'items': [make_item(1, "MELK", 1.19, "Milk", "Dairy")],
+    }])[0]
+
+    assert manage.reprocess(reprocess_args(db)) == 0
+
+    items = db.get_receipt_items([receipt_id, words_id])
+    assert items[receipt_id] == [
+        ("MELK", 1.19, "Milk", "Dairy"),
+        ("KAAS", 4.5, "KAAS", "Uncategorized"),
+        ("BROOD", 2.1, "BROOD", "Uncategorized"),
+    ]
+    # Word-box receipts cannot be rebuilt from their text
+    assert items[words_id] == [("MELK", 1.19, "Milk", "Dairy")]
+    assert_rollups_match_old_queries(db)
+
+
+def test_reprocess_skips_receipts_saved_from_the_gui(db):
+    text = "MELK   1,19\nKAAS   4,50\n"
+    # The user fixed a price, removed KAAS and added an item by hand
+    items = [make_item(1, "MELK", 1.29, "Milk", "Dairy"), make_item(2, "TAS", 0.25, "Bag", "Other")]
+    receipt_id = db.save_receipt("Jumbo", "2024-01-05", items, ocr_text=text, extraction='manual')
+
+    assert manage.reprocess(reprocess_args(db)) == 0
+    assert db.get_receipt_items([receipt_id])[receipt_id] == [
+        ("MELK", 1.29, "Milk", "Dairy"), ("TAS", 0.25, "Bag", "Other"),
+    ]
+
+    assert manage.reprocess(reprocess_args(db, overwrite_edits=True)) == 0
+    assert db.get_receipt_items([receipt_id])[receipt_id] == [
+        ("MELK", 1.19, "MELK", "Uncategorized"), ("KAAS", 4.5, "KAAS", "Uncategorized"),
+    ]
+    assert_rollups_match_old_queries(db)
+
+
+def test_replace_receipt_items_updates_rollups(db):
+    save_mixed_receipts(db)
+    receipt_ids = [row[0] for row in db.conn.execute('SELECT id FROM receipts ORDER BY id')]
+
+    # Drop one receipt's items and recategorize another's, without a rebuild
+    db.replace_receipt_items([
+        (receipt_ids[0], []),
+        (receipt_ids[1], [make_item(1, "BROOD", 2.5, category="Bread"), make_item(2, "EI", 1.0, category=None)]),
+    ])
+
+    assert_rollups_match_old_queries(db)
+    assert 'Bakery' not in [row[0] for row in db.conn.execute('SELECT category FROM category_month_totals')]
+
+
+def test_reprocess_overwrite_edits(db):
+    receipt_id = db.save_receipt("Jumbo", "2024-01-05", [make_item(1, "MELK", 1.19, "Milk", "Dairy")],
+                                 ocr_text="MELK   1,19\n")
+
+    assert manage.reprocess(reprocess_args(db, overwrite_edits=True)) == 0
+
+    assert db.get_receipt_items([receipt_id])[receipt_id] == [("MELK", 1.19, "MELK", "Uncategorized")]
+
+
+# The analytics queries as they were before the rollup tables, over receipts/items directly
+def old_expense_summary(conn):
+    total = conn.execute('SELECT SUM(total_amount) FROM receipts').fetchone()[0] or 0
+    by_store = conn.execute('''
+        SELECT store_name, SUM(total_amount), COUNT(*) FROM receipts GROUP BY store_name
+    ''').fetchall()
+    by_category = conn.execute('''
+        SELECT i.category, SUM(i.price * i.quantity) FROM items i GROUP BY i.category
+    ''').fetchall()
+    return total, by_store, by_category
+
+
+def old_monthly_report(conn):
+    return conn.execute('''
+        SELECT strftime('%Y-%m', date), SUM(total_amount), COUNT(*)
+        FROM receipts GROUP BY strftime('%Y-%m', date)
+    ''').fetchall()
+
+
+def normalized(rows):
+    """Rows with rounded amounts in a fixed order (rollups and old queries order ties differently)"""
+    return sorted(
+        (tuple(round(value, 6) if isinstance(value, float) else value for value in row) for row in rows),
+        key=repr,
+    )
+
+
+def assert_rollups_match_old_queries(db):
+    total, by_store, by_category = old_expense_summary(db.conn)
+    summary = db.get_expense_summary()
+    assert summary['total'] == pytest.approx(total)
+    assert normalized(summary['by_store']) == normalized(by_store)
+    assert normalized(summary['by_category']) == normalized(by_category)
+    assert normalized(db.get_monthly_report()) == normalized(old_monthly_report(db.conn))
+
+
+def save_mixed_receipts(db):
+    """Receipts with missing stores/categories and missing or unparseable dates, in several batches"""
+    db.save_receipt("Jumbo", "2024-01-05", [make_item(1, "MELK", 1.19, category="Dairy"),
+                                           make_item(2, "KAAS", 4.5, category=None)])
+    db.save_receipts([
+        {'store_name': "Jumbo", 'date': "2024-01-20", 'items': [make_item(1, "BROOD", 2.1, category="Bakery")]},
+        {'store_name': None, 'date': "2024-02-01", 'items': [make_item(1, "APPEL", 0.99, category="Fruit")]},
+        {'store_name': "Lidl", 'date': None, 'items': [make_item(1, "MELK", 1.05, category="Dairy")]},
+        {'store_name': "Lidl", 'date': "05-01-2024", 'items': [make_item(1, "EI", 2.49, category=None)]},
+        {'store_name': "Lidl", 'date': "2024-02-11", 'items': []},
+    ])
+    db.save_receipts([
+        {'store_name': None, 'date': None, 'items': [make_item(1, "BONUS", -0.5, category="Dairy")]},
+        {'store_name': "Jumbo", 'date': "2024-02-28", 'items': [make_item(1, "KAAS", 3.75, category="Dairy"),
+                                                                 make_item(2, "MELK", 1.19, category="Dairy")]},
+    ])
+
+
+def test_save_receipts_updates_rollups(db):
+    save_mixed_receipts(db)
+    assert_rollups_match_old_queries(db)
+
+
+def test_rebuild_rollups_is_idempotent(db):
+    save_mixed_receipts(db)
+
+    def rollups():
+        return (normalized(db.conn.execute('SELECT * FROM store_month_totals')),
+                normalized(db.conn.execute('SELECT * FROM category_month_totals')))
+
+    incremental = rollups()
+    db.rebuild_rollups()
+    assert rollups() == incremental
+    db.rebuild_rollups()
+    assert rollups() == incremental
+    assert_rollups_match_old_queries(db)
+
+
+def test_migrations_apply_to_committed_database(tmp_path):
+    path = tmp_path / 'receipts.db'
+    shutil.copyfile(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'receipts.db'), path)
+    before = sqlite3.connect(str(path))
+    receipt_count, item_count = before.execute(
+        'SELECT (SELECT COUNT(*) FROM receipts), (SELECT COUNT(*) FROM items)'
+    ).fetchone()
+    before.close()
+
+    db = DatabaseManager(str(path))
+    try:
+        assert get_version(db.conn) == MIGRATIONS[-1][0]
+        columns = {row[1] for row in db.conn.execute('PRAGMA table_info(receipts)')}
+        assert {'image_hash', 'ocr_text', 'extraction'} <= columns
+        assert db.conn.execute('SELECT COUNT(*) FROM receipts').fetchone()[0] == receipt_count
+        assert db.conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == item_count
+        assert_rollups_match_old_queries(db)
+        # Already migrated: nothing left to apply
+        assert migrate(db.conn) == MIGRATIONS[-1][0]
+    finally:
+        db.close()
+
+
+def save_paging_receipts(db, dated_items):
+    """dated_items items spread over receipts sharing dates, then 5 undated items"""
+    receipts = []
+    for index in range(dated_items):
+        receipts.append({'store_name': "Jumbo" if index % 3 else "Lidl",
+                         'date': f"2024-0{1 + index % 4}-1{index % 2}",
+                         'items': [make_item(1, f"ITEM {index}", 1.0 + index)]})
+    for index in range(5):
+        receipts.append({'store_name': "Jumbo" if index % 2 else "Lidl", 'date': None,
+                         'items': [make_item(1, f"UNDATED {index}", 0.5)]})
+    # A receipt with several items puts one date on more than one row
+    receipts.append({'store_name': "Jumbo", 'date': "2024-03-10",
+                     'items': [make_item(row, f"MULTI {row}", 2.0) for row in range(1, 4)]})
+    db.save_receipts(receipts)
+
+
+def all_pages(db, limit, **filters):
+    rows = []
+    cursor = None
+    while True:
+        page, cursor = db.get_receipts_page(after=cursor, limit=limit, **filters)
+        assert len(page) <= limit
+        rows += page
+        if cursor is None:
+            return rows
+
+
+# With the 3 multi-item rows: 4 and 11 end the dated rows exactly on a page of 7,
+# 6 ends the undated rows (and the whole traversal) exactly on a page
+@pytest.mark.parametrize('dated_items', [0, 4, 6, 11, 15])
+@pytest.mark.parametrize('filters', [
+    {},
+    {'store_name': "Jumbo"},
+    {'date_from': "2024-02-01", 'date_to': "2024-03-31"},
+    {'store_name': "Lidl", 'date_from': "2024-02-01"},
+])
+def test_receipts_page_traversal_matches_filtered_receipts(db, dated_items, filters):
+    save_paging_receipts(db, dated_items)
+
+    rows = all_pages(db, 7, **filters)
+
+    # Same rows in the same order as the filtered (and exported) view
+    assert rows == db.get_filtered_receipts(**filters)
+    assert rows == list(db.iter_receipts_with_items(**filters, batch_size=4))
+    # Newest first, undated receipts last
+    dates = [row[2] for row in rows]
+    dated = [date for date in dates if date is not None]
+    assert dated == sorted(dated, reverse=True)
+    assert dates == dated + [None] * (len(dates) - len(dated))
+
+
+def test_receipts_page_order_survives_reinserted_items(db):
+    save_paging_receipts(db, 11)
+    # Re-parsing gives an older receipt's items newer ids than a later receipt of the same date
+    first_multi = db.conn.execute("SELECT receipt_id FROM items WHERE item_name_dutch = 'ITEM 2'").fetchone()[0]
+    db.replace_receipt_items([(first_multi, [make_item(1, "ITEM 2", 3.0), make_item(2, "EXTRA", 1.0)])])
+
+    assert all_pages(db, 3) == db.get_filtered_receipts()
@@ -0,0 +1,268 @@
+import random
+import re
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import synthetic_texts
+from config import settings
+from image_processor import ImageProcessor, TesserocrBackend
+
+
+class FakeTessBaseAPI:
+    """Stand-in for tesserocr.PyTessBaseAPI that counts loaded engines"""
+
+    live = 0
+
+    def __init__(self, **options):
+        FakeTessBaseAPI.live += 1
+
+    def SetVariable(self, key, value):
+        pass
+
+    def SetImage(self, image):
+        pass
+
+    def GetUTF8Text(self):
+        return "MELK 1,19\n"
+
+    def End(self):
+        FakeTessBaseAPI.live -= 1
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch):
+    module = types.SimpleNamespace(PyTessBaseAPI=FakeTessBaseAPI)
+    monkeypatch.setitem(sys.modules, 'tesserocr', module)
+    FakeTessBaseAPI.live = 0
+    return module
+
+
+def test_strip_ocr_reuses_engines(fake_tesserocr, monkeypatch):
+    monkeypatch.setattr(settings, 'OCR_STRIPS', 3)
+    processor = ImageProcessor(ocr_backend=TesserocrBackend())
+    monkeypatch.setattr(processor, 'split_into_bands', lambda img: [(0, 10), (10, 20), (20, 30)])
+    image = np.zeros((30, 10), dtype=np.uint8)
+
+    for _ in range(10):
+        lines = processor._recognize(image, processor._tesseract_text)
+
+    assert [line['text'] for line in lines] == ["MELK 1,19"] * 3
+    # The constructor's engine plus at most one per band thread, however many calls
+    assert FakeTessBaseAPI.live <= 1 + settings.OCR_STRIPS
+
+    processor.close()
+    assert FakeTessBaseAPI.live == 0
+
+
+# The parser as it was before the single-pass rewrite, kept to check the rewrite against
+def old_clean_text(text):
+    text = text.replace("’", "'").replace("‘", "'").replace("°", "0").replace("~", "-")
+    text = re.sub(r"(\d)[/](\d)", r"\1.\2", text)
+    text = re.sub(r"(\d)\s+(\d{2})", r"\1.\2", text)
+    return text
+
+
+def old_extract_items_from_text(text):
+    items = []
+    flag = False
+    temp_name = ""
+    price_pattern = r'(-?\d+[.,]\d{2})'
+    row_number = 0
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            flag = True
+            continue
+        if not flag:
+            temp_name = ""
+        temp_name += line + " "
+        price_matches = re.findall(price_pattern, line)
+        if price_matches:
+            price = float(price_matches[-1].replace(',', '.'))
+            item_text = re.sub(price_pattern, '', temp_name).strip()
+            row_number += 1
+            item_text = re.sub(r'\s+', ' ', item_text)
+            item_text = item_text.strip('.,- ')
+            if len(item_text) > 1:
+                items.append({'row_number': row_number, 'dutch_name': item_text, 'english_name': '',
+                              'price': price, 'quantity': 1, 'category': 'Uncategorized'})
+                temp_name = ""
+                flag = False
+    return items
+
+
+def noisy_ocr_text(rng):
+    """Lines of OCR-ish tokens: prices in both notations, split numbers, stray symbols, blanks"""
+    tokens = ["MELK", "KAAS", "AH", "x", "2", "B", "-", ".", ",", "1,19", "-0,50", "12.99", "3/19",
+              "1 38", "4,5", "007", "’S", "°", "~", "TOTAAL", "  ", "\t"]
+    lines = []
+    for _ in range(rng.randint(0, 40)):
+        lines.append(' '.join(rng.choice(tokens) for _ in range(rng.randint(0, 6))))
+    return '\n'.join(lines)
+
+
+def test_parser_matches_old_parser():
+    processor = ImageProcessor()
+    rng = random.Random(0)
+    texts = synthetic_texts(500) + [noisy_ocr_text(rng) for _ in range(3000)]
+    for text in texts:
+        assert processor.extract_items_from_text(text) == old_extract_items_from_text(text)
+        cleaned = processor._clean_text(text)
+        assert processor.extract_items_from_text(cleaned) == old_extract_items_from_text(cleaned)
+
+
+def test_clean_text_matches_old_cleanup():
+    processor = ImageProcessor()
+    rng = random.Random(1)
+    for text in [noisy_ocr_text(rng) for _ in range(3000)]:
+        # The one documented difference: both number fixes touching the same digit
+        if not re.search(r"\d/\d\s+\d{2}", text):
+            assert processor._clean_text(text) == old_clean_text(text)
+
+
+@pytest.mark.parametrize('text, old, new', [
+    # The old second pass re-joined the digit the first pass had just produced
+    ("1/2 34", "1.2.34", "1.2 34"),
+    ("AH 3/4 50", "AH 3.4.50", "AH 3.4 50"),
+])
+def test_clean_text_documented_differences(text, old, new):
+    assert old_clean_text(text) == old
+    assert ImageProcessor()._clean_text(text) == new
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("MELK 3/19", "MELK 3.19"),
+    ("KAAS 1 38", "KAAS 1.38"),
+    ("’S ‘ 1°0 ~", "'S ' 100 -"),
+])
+def test_clean_text_fixes(text, expected):
+    assert ImageProcessor()._clean_text(text) == expected
+
+
+def text_rows(height, width, rows):
+    """White page with black 'text' in the given row ranges"""
+    image = np.full((height, width), 255, dtype=np.uint8)
+    for top, bottom in rows:
+        image[top:bottom, 10:width - 10] = 0
+    return image
+
+
+def test_split_into_bands_cuts_in_blank_gaps(monkeypatch):
+    monkeypatch.setattr(settings, 'OCR_STRIPS', 2)
+    monkeypatch.setattr(settings, 'OCR_STRIP_MIN_HEIGHT', 400)
+    image = text_rows(1000, 200, [(0, 480), (520, 1000)])
+
+    assert ImageProcessor().split_into_bands(image) == [(0, 499), (499, 1000)]
+
+
+def test_split_into_bands_overlaps_cuts_through_text(monkeypatch):
+    monkeypatch.setattr(settings, 'OCR_STRIPS', 2)
+    monkeypatch.setattr(settings, 'OCR_STRIP_MIN_HEIGHT', 400)
+    overlap = settings.OCR_STRIP_OVERLAP
+    image = text_rows(1000, 200, [(0, 1000)])
+
+    assert ImageProcessor().split_into_bands(image) == [(0, 500 + overlap), (500 - overlap, 1000)]
+
+
+def test_split_into_bands_tall_gap_spanning_targets(monkeypatch):
+    monkeypatch.setattr(settings, 'OCR_STRIPS', 4)
+    monkeypatch.setattr(settings, 'OCR_STRIP_MIN_HEIGHT', 400)
+    # One blank gap covers the targets at rows 500, 1000 and 1500
+    image = text_rows(2000, 200, [(0, 100), (1900, 2000)])
+
+    bands = ImageProcessor().split_into_bands(image)
+
+    assert bands == [(0, 999), (999, 2000)]
+    assert all(bottom > top for top, bottom in bands)
+
+
+def test_split_into_bands_single_band_when_cuts_collapse(monkeypatch):
+    monkeypatch.setattr(settings, 'OCR_STRIPS', 2)
+    monkeypatch.setattr(settings, 'OCR_STRIP_MIN_HEIGHT', 400)
+    image = text_rows(1000, 200, [(0, 100)])
+
+    bands = ImageProcessor().split_into_bands(image)
+
+    assert bands[0][0] == 0 and bands[-1][1] == 1000
+    assert all(bottom > top for top, bottom in bands)
+
+
+def word(text, left, top=0, conf=95.0, height=20):
+    return {'text': text, 'conf': conf, 'left': left, 'top': top, 'width': 10 * len(text), 'height': height}
+
+
+def priced_line(top, name, price, right=400, conf=95.0):
+    """A line with name words from the left margin and a price right-aligned at right"""
+    words = []
+    left = 10
+    for part in name.split():
+        words.append(word(part, left, top, conf))
+        left += 10 * len(part) + 10
+    words.append(word(price, right - 10 * len(price), top, conf))
+    return {'text': f"{name} {price}", 'words': words}
+
+
+def test_words_quantity_line_takes_name_from_line_above():
+    lines = [
+        priced_line(0, "JMB VOLKOREN NOEDELS", "1,18"),
+        {'text': "KAISERBR DESEM WIT", 'words': [word("KAISERBR", 10), word("DESEM", 100), word("WIT", 160)]},
+        {'text': "2 X 0,35 0,70", 'words': [word("2", 10, 40), word("X", 30, 40), word("0,35", 60, 40),
+                                            word("0,70", 360, 40)]},
+        priced_line(60, "0,535 KG x 2,99", "1,60"),
+        priced_line(80, "CASINO WIT", "1,49"),
+    ]
+
+    items = ImageProcessor().extract_items_from_words(lines)
+
+    assert [(item['dutch_name'], item['price']) for item in items] == [
+        ("JMB VOLKOREN NOEDELS", 1.18),
+        ("KAISERBR DESEM WIT", 0.70),
+        # No name line above: the weighed line has no usable name
+        ("CASINO WIT", 1.49),
+    ]
+    assert [item['row_number'] for item in items] == [1, 2, 4]
+
+
+def test_words_prices_come_from_the_price_column():
+    lines = [
+        priced_line(0, "MELK", "1,19"),
+        priced_line(20, "KAAS", "4,50"),
+        priced_line(40, "BROOD", "2,10"),
+        # Unit prices and VAT amounts further left are not the column
+        priced_line(60, "BTW 9%", "0,64", right=200),
+        {'text': "APPELS 3,99 B", 'words': [word("APPELS", 10), word("3,99", 150, 80), word("B", 420, 80)]},
+    ]
+
+    items = ImageProcessor().extract_items_from_words(lines)
+
+    assert [(item['dutch_name'], item['price']) for item in items] == [
+        ("MELK", 1.19), ("KAAS", 4.5), ("BROOD", 2.1),
+    ]
+
+
+def test_words_confidence_flags_review(monkeypatch):
+    monkeypatch.setattr(settings, 'ITEM_REVIEW_CONFIDENCE', 80.0)
+    lines = [priced_line(0, "MELK", "1,19", conf=95.0), priced_line(20, "KAAS", "4,50", conf=62.5)]
+
+    items = ImageProcessor().extract_items_from_words(lines)
+
+    assert [(item['confidence'], item['needs_review']) for item in items] == [(95.0, False), (62.5, True)]
+
+
+def test_words_without_prices():
+    assert ImageProcessor().extract_items_from_words([{'text': "TOTAAL", 'words': [word("TOTAAL", 10)]}]) == []
+
+
+def test_merge_split_prices():
+    processor = ImageProcessor()
+
+    merged = processor._merge_split_prices([word("MELK", 10), word("1", 300), word("19", 315, conf=70.0)])
+    assert [w['text'] for w in merged] == ["MELK", "1.19"]
+    assert merged[1]['left'] == 300 and merged[1]['width'] == 35 and merged[1]['conf'] == 70.0
+
+    # A wide gap is two separate numbers, and only two-digit cents are joined
+    assert [w['text'] for w in processor._merge_split_prices([word("1", 300), word("19", 400)])] == ["1", "19"]
+    assert [w['text'] for w in processor._merge_split_prices([word("1", 300), word("195", 315)])] == ["1", "195"]
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from config import settings
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+@pytest.fixture
+def queue(db_path):
+    job_queue = JobQueue(db_path)
+    yield job_queue
+    job_queue.close()
+
+
+def task_row(queue, task_id):
+    return queue.conn.execute(
+        'SELECT status, attempts, image IS NOT NULL, error FROM job_tasks WHERE id = ?', (task_id,)
+    ).fetchone()
+
+
+def test_concurrent_workers_never_claim_the_same_task(db_path, queue):
+    queue.submit([(f"{index}.jpg", b'image') for index in range(50)])
+    workers = [JobQueue(db_path) for _ in range(4)]
+    claimed = [[] for _ in workers]
+    start = threading.Barrier(len(workers))
+
+    def drain(worker, tasks):
+        start.wait()
+        while True:
+            task = worker.claim()
+            if task is None:
+                return
+            tasks.append(task['id'])
+
+    threads = [threading.Thread(target=drain, args=pair) for pair in zip(workers, claimed)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for worker in workers:
+        worker.close()
+
+    task_ids = [task_id for tasks in claimed for task_id in tasks]
+    assert len(task_ids) == 50
+    assert len(set(task_ids)) == 50
+
+
+def test_single_task_is_claimed_once(db_path, queue):
+    queue.submit([("a.jpg", b'image')])
+    other = JobQueue(db_path)
+    try:
+        first, second = queue.claim(), other.claim()
+    finally:
+        other.close()
+    assert (first is None) != (second is None)
+
+
+def test_retryable_failure_requeues_until_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+    job_id = queue.submit([("a.jpg", b'image')])
+
+    for attempt in (1, 2):
+        task = queue.claim()
+        queue.fail(task['id'], "OCR crashed")
+        assert task_row(queue, task['id']) == ('queued', attempt, 1, "OCR crashed")
+
+    task = queue.claim()
+    assert task['image'] == b'image'
+    queue.fail(task['id'], "OCR crashed")
+    assert task_row(queue, task['id']) == ('failed', 3, 0, "OCR crashed")
+    assert queue.claim() is None
+    assert queue.get_job(job_id)['status'] == 'done'
+
+
+def test_non_retryable_failure_fails_at_once(queue):
+    job_id = queue.submit([("a.jpg", b'junk')])
+    task = queue.claim()
+
+    queue.fail(task['id'], "Could not decode image data", retry=False)
+
+    assert task_row(queue, task['id']) == ('failed', 1, 0, "Could not decode image data")
+    job = queue.get_job(job_id)
+    assert (job['status'], job['failed']) == ('done', 1)
+    assert job['results'][0]['error'] == "Could not decode image data"
+
+
+def test_stale_running_task_is_requeued(queue, monkeypatch):
+    monkeypatch.setattr(settings, 'JOB_MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(settings, 'JOB_STALE_AFTER', 60)
+    queue.submit([("a.jpg", b'image')])
+    task = queue.claim()
+    assert queue.claim() is None  # still running and fresh
+
+    # The worker died an hour ago
+    queue.conn.execute('UPDATE job_tasks SET claimed_at = ?', (time.time() - 3600,))
+    queue.conn.commit()
+    retried = queue.claim()
+    assert retried['id'] == task['id']
+    assert task_row(queue, task['id'])[:2] == ('running', 2)
+
+    # Out of attempts: a second stale claim ends the task
+    queue.conn.execute('UPDATE job_tasks SET claimed_at = ?', (time.time() - 3600,))
+    queue.conn.commit()
+    assert queue.claim() is None
+    assert task_row(queue, task['id'])[0] == 'failed'
+
+
+def test_complete_stores_result(queue):
+    job_id = queue.submit([("a.jpg", b'image'), ("b.jpg", b'image')])
+    task = queue.claim()
+    queue.complete(task['id'], {'items': [{'dutch_name': "MELK", 'price': 1.19}]})
+
+    job = queue.get_job(job_id)
+    assert (job['status'], job['done'], job['queued']) == ('running', 1, 1)
+    assert job['results'][0]['items'] == [{'dutch_name': "MELK", 'price': 1.19}]
+    assert queue.pending_count() == 1
+
+
+def test_purge_deletes_only_old_jobs(queue):
+    old_job = queue.submit([("a.jpg", b'image')])
+    new_job = queue.submit([("b.jpg", b'image')])
+    queue.conn.execute('UPDATE jobs SET created_at = ? WHERE id = ?', (time.time() - 3600, old_job))
+    queue.conn.commit()
+
+    assert queue.purge(older_than=60) == 1
+    assert queue.get_job(old_job) is None
+    assert queue.get_job(new_job)['total'] == 1
+    assert queue.conn.execute('SELECT COUNT(*) FROM job_tasks').fetchone()[0] == 1
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+import metrics
+from metrics import MetricsRegistry
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('app_requests_total', 'Requests by route', ('route',))
+    latency = registry.histogram('app_seconds', 'Latency', ('stage',), buckets=(0.1, 1.0))
+    registry.callback('app_depth', 'Queue depth', 'gauge', lambda: {('jobs',): 3}, ('queue',))
+
+    def broken():
+        raise RuntimeError("database closed")
+
+    registry.callback('app_broken', 'Fails at scrape time', 'gauge', broken)
+    requests.inc(route='/a')
+    requests.inc(2, route='/a')
+    latency.observe(0.05, stage='ocr')
+    latency.observe(0.5, stage='ocr')
+    latency.observe(5, stage='ocr')
+
+    assert registry.render() == '\n'.join([
+        '# HELP app_requests_total Requests by route',
+        '# TYPE app_requests_total counter',
+        'app_requests_total{route="/a"} 3',
+        '# HELP app_seconds Latency',
+        '# TYPE app_seconds histogram',
+        'app_seconds_bucket{stage="ocr",le="0.1"} 1',
+        'app_seconds_bucket{stage="ocr",le="1"} 2',
+        'app_seconds_bucket{stage="ocr",le="+Inf"} 3',
+        'app_seconds_sum{stage="ocr"} 5.55',
+        'app_seconds_count{stage="ocr"} 3',
+        '# HELP app_depth Queue depth',
+        '# TYPE app_depth gauge',
+        'app_depth{queue="jobs"} 3',
+        '# HELP app_broken Fails at scrape time',
+        '# TYPE app_broken gauge',
+    ]) + '\n'
+
+
+def test_stage_counts_errors():
+    before = metrics.STAGE_ERRORS.values.get(('test-stage',), 0)
+    with pytest.raises(ValueError):
+        with metrics.stage('test-stage'):
+            raise ValueError("boom")
+    assert metrics.STAGE_ERRORS.values[('test-stage',)] == before + 1
+
+
+def test_collect_is_isolated_between_concurrent_tasks():
+    async def request(name, delay):
+        with metrics.collect() as timings:
+            for _ in range(3):
+                with metrics.stage(name):
+                    await asyncio.sleep(delay)
+                # Nested blocks share the request's dict
+                with metrics.collect() as nested:
+                    assert nested is timings
+        return timings
+
+    async def scenario():
+        return await asyncio.gather(request('first', 0.01), request('second', 0.002))
+
+    first, second = asyncio.run(scenario())
+    assert set(first) == {'first'}
+    assert set(second) == {'second'}
+    assert first['first'] > second['second']
+    # Nothing leaks outside a collect() block
+    with metrics.stage('outside'):
+        pass
+    with metrics.collect() as timings:
+        assert timings == {}
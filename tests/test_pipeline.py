@@ -0,0 +1,60 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import pipeline
+from pipeline import OCRWorkerPool, PipelineBusyError
+from tests.conftest import StubExecutor
+
+
+def double(value):
+    return value * 2
+
+
+def test_submit_rejects_when_pending_reaches_capacity():
+    pool = OCRWorkerPool(max_workers=1, max_pending=2)
+    pool._executor = StubExecutor(hold=True)
+
+    async def scenario():
+        running = [asyncio.create_task(pool.submit(double, value)) for value in (1, 2)]
+        await asyncio.sleep(0)
+        assert pool.pending == 2
+        with pytest.raises(PipelineBusyError):
+            await pool.submit(double, 3)
+
+        for future, fn, args in pool._executor.held:
+            future.set_result(fn(*args))
+        assert await asyncio.gather(*running) == [2, 4]
+        assert pool.pending == 0
+        # Capacity is back once the queue drained
+        pool._executor.hold = False
+        assert await pool.submit(double, 5) == 10
+
+    asyncio.run(scenario())
+
+
+def test_broken_pool_is_replaced(monkeypatch):
+    created = []
+
+    def executor_factory(**kwargs):
+        created.append(StubExecutor())
+        return created[-1]
+
+    monkeypatch.setattr(pipeline, 'ProcessPoolExecutor', executor_factory)
+    pool = OCRWorkerPool(max_workers=1, max_pending=4)
+
+    def worker_died(value):
+        raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await pool.submit(worker_died, 1)
+        assert created[0].shut_down
+        assert pool._executor is None
+        assert pool.pending == 0
+        # The next request starts a fresh pool
+        assert await pool.submit(double, 2) == 4
+        assert len(created) == 2 and pool._executor is created[1]
+
+    asyncio.run(scenario())
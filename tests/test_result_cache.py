@@ -0,0 +1,86 @@
+import pytest
+
+import result_cache
+from config import settings
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'cache.db')
+
+
+def table_bytes(cache):
+    return cache.conn.execute('SELECT COALESCE(SUM(size), 0) FROM result_cache').fetchone()[0]
+
+
+def test_key_changes_with_config_and_version(monkeypatch):
+    key = ResultCache.make_key(b'image', 'balanced', 'text')
+    assert ResultCache.make_key(b'image', 'balanced', 'text') == key
+
+    for name, value in (('OCR_ENGINE', 'pytesseract'), ('OCR_STRIPS', settings.OCR_STRIPS + 1),
+                        ('PREPROCESS_AUTO_MIN_CONFIDENCE', 10.0)):
+        with monkeypatch.context() as patch:
+            patch.setattr(settings, name, value)
+            assert ResultCache.make_key(b'image', 'balanced', 'text') != key, name
+
+    with monkeypatch.context() as patch:
+        balanced = {**settings.PREPROCESS_PROFILES['balanced'], 'denoise': False}
+        patch.setattr(settings, 'PREPROCESS_PROFILES', {**settings.PREPROCESS_PROFILES, 'balanced': balanced})
+        assert ResultCache.make_key(b'image', 'balanced', 'text') != key
+
+    monkeypatch.setattr(result_cache, 'CACHE_VERSION', result_cache.CACHE_VERSION + 1)
+    assert ResultCache.make_key(b'image', 'balanced', 'text') != key
+
+
+def test_config_change_misses_cache(db_path, monkeypatch):
+    cache = ResultCache(max_entries=10, db_path=db_path)
+    cache.put(ResultCache.make_key(b'image'), {'items': []})
+    assert cache.get(ResultCache.make_key(b'image')) == {'items': []}
+
+    monkeypatch.setattr(result_cache, 'CACHE_VERSION', result_cache.CACHE_VERSION + 1)
+    assert cache.get(ResultCache.make_key(b'image')) is None
+    assert cache.stats()['misses'] == 1
+    cache.close()
+
+
+def test_eviction_keeps_disk_tier_under_limit(db_path):
+    cache = ResultCache(max_entries=0, db_path=db_path, max_db_bytes=1000)
+    for index in range(30):
+        cache.put(f'key{index}', {'text': 'x' * 100})
+        assert cache.db_bytes == table_bytes(cache) <= 1000
+
+    # Oldest entries went first
+    assert cache.get('key0') is None
+    assert cache.get('key29') == {'text': 'x' * 100}
+
+    # Overwriting a key replaces its size rather than adding to it
+    before = cache.db_bytes
+    cache.put('key29', {'text': 'y' * 100})
+    assert cache.db_bytes == table_bytes(cache) == before
+    cache.put('key29', {'text': 'z' * 400})
+    assert cache.db_bytes == table_bytes(cache) <= 1000
+    assert cache.get('key29') == {'text': 'z' * 400}
+    cache.close()
+
+
+def test_db_bytes_reloaded_on_reopen(db_path):
+    cache = ResultCache(max_entries=0, db_path=db_path, max_db_bytes=1000)
+    for index in range(5):
+        cache.put(f'key{index}', {'text': 'x' * 100})
+    stored = cache.db_bytes
+    cache.close()
+
+    reopened = ResultCache(max_entries=0, db_path=db_path, max_db_bytes=1000)
+    assert reopened.db_bytes == stored == table_bytes(reopened)
+    for index in range(5, 20):
+        reopened.put(f'key{index}', {'text': 'x' * 100})
+    assert reopened.db_bytes == table_bytes(reopened) <= 1000
+    reopened.close()
+
+
+def test_results_are_copies():
+    cache = ResultCache(max_entries=10, db_path='')
+    cache.put('key', {'items': [{'english_name': ''}]})
+    cache.get('key')['items'][0]['english_name'] = 'milk'
+    assert cache.get('key') == {'items': [{'english_name': ''}]}
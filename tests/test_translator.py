@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from config import settings
+from translation_memory import TranslationMemory
+from translator import OfflineGlossaryBackend, TranslationBackend, TranslationService
+
+
+@pytest.fixture(scope='module')
+def backend():
+    return OfflineGlossaryBackend()
+
+
+@pytest.mark.parametrize('name, expected', [
+    # Unmatched text keeps its punctuation and spacing
+    ("KIES&MIX BROODJES", "KIES&MIX rolls"),
+    ("MELK (2X)", "milk (2X)"),
+    ("AH/JUMBO MELK", "AH/JUMBO milk"),
+    ("5% KORTING", "5% discount"),
+    # Phrases, fuzzy matches and compound heads replace their words only
+    ("HALFVOLLE MELK 1L", "semi-skimmed milk 1L"),
+    ("AH KARNEMELK", "AH buttermilk"),
+    ("", ""),
+])
+def test_lookup_keeps_unmatched_text(backend, name, expected):
+    assert backend.lookup(name) == expected
+
+
+class FakeRemoteBackend(TranslationBackend):
+    """Bulk-capable backend that records its calls; 'TRAAG' never answers in time"""
+
+    supports_bulk = True
+
+    def __init__(self, bulk='ok'):
+        self.bulk = bulk
+        self.calls = []
+
+    async def translate(self, text, src_lang, dest_lang):
+        self.calls.append(text)
+        if '\n' in text:
+            if self.bulk == 'fail':
+                raise ConnectionError("bulk request refused")
+            if self.bulk == 'short':
+                return text.split('\n')[0].lower()
+        if text == 'TRAAG':
+            await asyncio.sleep(1)
+        return '\n'.join(line.lower() for line in text.split('\n'))
+
+
+def items_named(*names):
+    return [{'dutch_name': name, 'english_name': '', 'price': 1.0} for name in names]
+
+
+@pytest.fixture
+def memory(tmp_path):
+    translation_memory = TranslationMemory(str(tmp_path / 'memory.db'))
+    yield translation_memory
+    translation_memory.close()
+
+
+def translate(service, items, timeout=0.05):
+    return asyncio.run(service.translate_items_async(items, timeout=timeout))
+
+
+def test_bulk_translates_each_distinct_name_once(memory, monkeypatch):
+    monkeypatch.setattr(settings, 'TRANSLATION_BULK', True)
+    backend = FakeRemoteBackend()
+    service = TranslationService(memory=memory, backend=backend)
+
+    items = translate(service, items_named("MELK", "KAAS", "MELK"))
+
+    assert backend.calls == ["MELK\nKAAS"]
+    assert [item['english_name'] for item in items] == ["melk", "kaas", "melk"]
+    assert memory.get_many(["MELK", "KAAS"]) == {"MELK": "melk", "KAAS": "kaas"}
+
+    # Known names come from the memory without a backend call
+    backend.calls.clear()
+    assert [item['english_name'] for item in translate(service, items_named("KAAS"))] == ["kaas"]
+    assert backend.calls == []
+
+
+@pytest.mark.parametrize('bulk', ['fail', 'short'])
+def test_bulk_failure_falls_back_to_items_with_timeouts(memory, monkeypatch, bulk):
+    monkeypatch.setattr(settings, 'TRANSLATION_BULK', True)
+    backend = FakeRemoteBackend(bulk=bulk)
+    service = TranslationService(memory=memory, backend=backend)
+
+    items = translate(service, items_named("MELK", "TRAAG", "KAAS"))
+
+    assert backend.calls[0] == "MELK\nTRAAG\nKAAS"
+    assert sorted(backend.calls[1:]) == ["KAAS", "MELK", "TRAAG"]
+    # The timed-out name keeps its Dutch name; the others are translated
+    assert [item['english_name'] for item in items] == ["melk", "TRAAG", "kaas"]
+    # Only real translations are remembered, so the slow name is retried next time
+    assert memory.get_many(["MELK", "TRAAG", "KAAS"]) == {"MELK": "melk", "KAAS": "kaas"}
+
+
+def test_items_without_bulk_are_translated_one_by_one(monkeypatch):
+    monkeypatch.setattr(settings, 'TRANSLATION_BULK', False)
+    monkeypatch.setattr(settings, 'TRANSLATION_MEMORY_ENABLED', False)
+    backend = FakeRemoteBackend()
+    service = TranslationService(backend=backend)
+
+    items = translate(service, items_named(*[f"ITEM{index}" for index in range(8)], "TRAAG"), timeout=0.2)
+
+    # The slow name times out alone and does not hold up the rest
+    assert [item['english_name'] for item in items] == [f"item{index}" for index in range(8)] + ["TRAAG"]
+    assert "\n" not in ''.join(backend.calls)
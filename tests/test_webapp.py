@@ -0,0 +1,192 @@
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from config import settings
+
+
+@pytest.fixture
+def client(webapp):
+    with TestClient(webapp.app) as test_client:
+        yield test_client
+
+
+def fake_pipeline(data, profile=None, extraction=None):
+    """process_image_bytes stand-in: 'bad' does not decode, anything else is one receipt"""
+    if data.startswith(b'bad'):
+        raise ValueError("Could not decode image data")
+    return {
+        'text': "MELK 1,19", 'profile': profile, 'confidence': 91.0, 'crop_ratio': 1.0,
+        'items': [{'row_number': 1, 'dutch_name': "MELK", 'english_name': '', 'price': 1.19,
+                   'quantity': 1, 'category': 'Uncategorized'}],
+        'timings': {'tesseract': 0.01},
+    }
+
+
+@pytest.fixture
+def fake_ocr(webapp, monkeypatch):
+    monkeypatch.setattr(webapp, 'process_image_bytes', fake_pipeline)
+
+
+def upload(data=b'image', name='receipt.jpg', content_type='image/jpeg'):
+    return {'file': (name, data, content_type)}
+
+
+def test_extract_items(client, fake_ocr):
+    response = client.post('/v1/extract-items', files=upload())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [(item['dutch_name'], item['english_name']) for item in body['items']] == [("MELK", "milk")]
+    assert body['cached'] is False
+
+
+def test_extract_items_busy_pool_answers_503(client, webapp, fake_ocr, monkeypatch):
+    monkeypatch.setattr(webapp.ocr_pool, 'max_pending', 2)
+    monkeypatch.setattr(webapp.ocr_pool, 'pending', 2)
+
+    response = client.post('/v1/extract-items', files=upload())
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(settings.OCR_RETRY_AFTER)
+    assert webapp.ocr_pool._executor.calls == 0
+
+
+def test_extract_items_undecodable_upload_answers_422(client, fake_ocr):
+    response = client.post('/v1/extract-items', files=upload(b'bad image'))
+
+    assert response.status_code == 422
+    assert response.json()['detail'] == "Could not decode image data"
+
+
+def stream_files(*uploads):
+    return [('files', (name, data, 'image/jpeg')) for name, data in uploads]
+
+
+def test_stream_ndjson(client, fake_ocr):
+    response = client.post('/v1/extract-items/stream?stages=true',
+                           files=stream_files(('a.jpg', b'image a'), ('b.jpg', b'bad b'), ('c.jpg', b'image c')))
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1] == {'event': 'done', 'total': 3, 'failed': 1}
+
+    by_index = {}
+    for event in events[:-1]:
+        by_index.setdefault(event['index'], []).append(event['event'])
+    assert by_index == {0: ['ocr', 'translated', 'result'], 1: ['error'], 2: ['ocr', 'translated', 'result']}
+
+    error = next(event for event in events if event['event'] == 'error')
+    assert (error['filename'], error['error']) == ('b.jpg', "Could not decode image data")
+    result = next(event for event in events if event['event'] == 'result')
+    assert result['items'][0]['english_name'] == "milk"
+
+
+def test_stream_sse(client, fake_ocr):
+    response = client.post('/v1/extract-items/stream?format=sse',
+                           files=stream_files(('a.jpg', b'image a'), ('b.jpg', b'bad b')))
+
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert response.headers['cache-control'] == 'no-cache'
+    frames = response.text.split('\n\n')
+    assert frames[-1] == ''
+    events = []
+    for frame in frames[:-1]:
+        event_line, data_line = frame.split('\n')
+        assert event_line.startswith('event: ') and data_line.startswith('data: ')
+        data = json.loads(data_line[len('data: '):])
+        assert data['event'] == event_line[len('event: '):]
+        events.append(data)
+    assert sorted(event['event'] for event in events) == ['done', 'error', 'result']
+    assert events[-1]['event'] == 'done'
+
+
+def test_stream_busy_pool_reports_retry_after(client, webapp, fake_ocr, monkeypatch):
+    monkeypatch.setattr(webapp.ocr_pool, 'max_pending', 1)
+    monkeypatch.setattr(webapp.ocr_pool, 'pending', 1)
+
+    response = client.post('/v1/extract-items/stream', files=stream_files(('a.jpg', b'image a')))
+
+    error = json.loads(response.text.splitlines()[0])
+    assert (error['event'], error['retry_after']) == ('error', settings.OCR_RETRY_AFTER)
+
+
+@pytest.mark.parametrize('query, files, status', [
+    ('?format=xml', [('a.jpg', b'image')], 422),
+    ('', [('a.gif', b'image')], 415),
+])
+def test_stream_rejects_before_streaming(client, fake_ocr, query, files, status):
+    uploads = [('files', (name, data, 'image/gif' if name.endswith('.gif') else 'image/jpeg'))
+               for name, data in files]
+    assert client.post('/v1/extract-items/stream' + query, files=uploads).status_code == status
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_unpack_zip_keeps_image_members_in_order(webapp):
+    archive = make_zip([('b.jpg', b'bb'), ('notes.txt', b'x'), ('__MACOSX/._b.jpg', b'x'),
+                        ('dir/a.PNG', b'aa'), ('c.webp', b'cc')])
+
+    assert webapp.unpack_zip(archive, 100) == [('b.jpg', b'bb'), ('dir/a.PNG', b'aa'), ('c.webp', b'cc')]
+
+
+def test_unpack_zip_limits(webapp, monkeypatch):
+    with pytest.raises(HTTPException) as error:
+        webapp.unpack_zip(make_zip([('a.jpg', b'a' * 60), ('b.jpg', b'b' * 60)]), 100)
+    assert error.value.status_code == 413
+
+    monkeypatch.setattr(webapp, 'MAX_BYTES', 10)
+    with pytest.raises(HTTPException) as error:
+        webapp.unpack_zip(make_zip([('a.jpg', b'a' * 11)]), 100)
+    assert error.value.status_code == 413
+
+    with pytest.raises(HTTPException) as error:
+        webapp.unpack_zip(io.BytesIO(b'not a zip'), 100)
+    assert error.value.status_code == 422
+
+
+def test_jobs_accept_zip_uploads(client):
+    archive = make_zip([('a.jpg', b'image a'), ('b.jpg', b'image b')]).getvalue()
+    response = client.post('/v1/jobs', files=[('files', ('batch.zip', archive, 'application/zip')),
+                                              ('files', ('c.jpg', b'image c', 'image/jpeg'))])
+
+    assert response.status_code == 202
+    assert response.json()['images'] == 3
+    job = client.get(response.json()['status_url']).json()
+    assert [entry['filename'] for entry in job['results']] == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert job['status'] == 'queued'
+
+
+def test_undecodable_upload_counts_as_decode_error(client, webapp, fake_ocr):
+    errors = webapp.metrics.STAGE_ERRORS.values
+    pipeline_before = errors.get(('pipeline',), 0)
+    decode_before = errors.get(('decode',), 0)
+
+    client.post('/v1/extract-items', files=upload(b'bad image'))
+
+    assert errors.get(('pipeline',), 0) == pipeline_before
+    assert errors[('decode',)] == decode_before + 1
+
+
+def test_metrics_endpoint(client, fake_ocr):
+    client.post('/v1/extract-items', files=upload())
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert '# TYPE receipt_stage_seconds histogram' in response.text
+    assert 'receipt_stage_seconds_count{stage="tesseract"}' in response.text
+    assert 'receipt_queue_depth{queue="jobs"} 0' in response.text
+    assert 'receipt_cache_requests_total{cache="result",result="miss"}' in response.text
@@ -0,0 +1,106 @@
+# translation_memory.py
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import settings
+from utils.helpers import LRUCache
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class TranslationMemory:
+    """Remembers Dutch item names already translated to English
+
+    Lookups hit an in-process LRU first and fall back to the
+    ``translation_memory`` table in SQLite, so repeated supermarket item
+    names never go to the remote translator twice.
+    """
+
+    def __init__(self, db_name: str = None, max_entries: int = None):
+        self.db_name = db_name or settings.TRANSLATION_MEMORY_DB
+        self.cache = LRUCache(settings.TRANSLATION_MEMORY_CACHE_SIZE if max_entries is None else max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        self._lock = threading.Lock()
+        self.init_database()
+
+    def init_database(self):
+        """Create the translation memory table"""
+        self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS translation_memory (
+                dutch_name TEXT PRIMARY KEY,
+                english_name TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Normalize an item name so OCR spacing/case variants share one entry"""
+        return _WHITESPACE.sub(' ', name).strip(' .,-').casefold()
+
+    def get(self, dutch_name: str) -> Optional[str]:
+        """Return the remembered translation, or None"""
+        return self.get_many([dutch_name]).get(dutch_name)
+
+    def get_many(self, dutch_names: Iterable[str]) -> Dict[str, str]:
+        """Look up several names at once; returns {dutch_name: english_name} for hits"""
+        found = {}
+        missing = {}
+        for name in dutch_names:
+            key = self.normalize(name)
+            english = self.cache.get(key)
+            if english is not None:
+                found[name] = english
+            else:
+                missing.setdefault(key, []).append(name)
+
+        if missing:
+            keys = list(missing)
+            placeholders = ','.join('?' * len(keys))
+            with self._lock:
+                rows = self.conn.execute(
+                    f'SELECT dutch_name, english_name FROM translation_memory WHERE dutch_name IN ({placeholders})',
+                    keys
+                ).fetchall()
+            for key, english in rows:
+                self.cache.put(key, english)
+                for name in missing.pop(key):
+                    found[name] = english
+
+        self.hits += len(found)
+        self.misses += sum(len(names) for names in missing.values())
+        return found
+
+    def put(self, dutch_name: str, english_name: str):
+        """Remember a single translation"""
+        self.put_many([(dutch_name, english_name)])
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]]):
+        """Remember several translations in one transaction"""
+        rows = [(self.normalize(dutch), english) for dutch, english in pairs if dutch and english]
+        if not rows:
+            return
+
+        for key, english in rows:
+            self.cache.put(key, english)
+        with self._lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO translation_memory (dutch_name, english_name) VALUES (?, ?)',
+                rows
+            )
+            self.conn.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters"""
+        return {'hits': self.hits, 'misses': self.misses, 'cached_entries': len(self.cache)}
+
+    def close(self):
+        """Close database connection"""
+        if self.conn:
+            self.conn.close()
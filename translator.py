@@ -1,35 +1,262 @@
 # translator.py
-from googletrans import Translator
-from typing import List, Dict
+import asyncio
+import difflib
+import inspect
+import json
+import re
+import threading
+from functools import lru_cache
+from typing import List, Dict, Optional
+import metrics
+from config import settings
+from config.grocery_lexicon import GROCERY_LEXICON
+from translation_memory import TranslationMemory
+
+
+class TranslationBackend:
+    """Interface for the engines TranslationService can translate with"""
+
+    # Whether newline-joined bulk requests are worth it (remote APIs)
+    supports_bulk = False
+    # Whether results should be written to the translation memory
+    remember_results = True
+
+    async def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        raise NotImplementedError
+
+    async def close(self):
+        """Release connections held by the backend"""
+
+
+class GoogleTranslateBackend(TranslationBackend):
+    """Remote translation through googletrans"""
+
+    supports_bulk = True
 
-class TranslationService:
-    """Handles translation operations"""
-    
     def __init__(self):
+        from googletrans import Translator
         self.translator = Translator()
-    
+
+    async def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        # Accept both the sync (<4.0.2) and async googletrans APIs
+        result = self.translator.translate(text, src=src_lang, dest=dest_lang)
+        if inspect.isawaitable(result):
+            result = await result
+        return result.text
+
+    async def close(self):
+        """Close the HTTP client the translator keeps between requests"""
+        client = getattr(self.translator, 'client', None)
+        close = getattr(client, 'aclose', None) or getattr(client, 'close', None)
+        if close:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+
+class OfflineGlossaryBackend(TranslationBackend):
+    """Local Dutch -> English translation from a grocery lexicon
+
+    Whole names are looked up first, then word by word; unknown words
+    fall back to a fuzzy match (OCR typos) and to the head of Dutch
+    compounds (e.g. "karnemelk" -> "melk"). Words that cannot be matched
+    are kept as-is.
+    """
+
+    # Deterministic and local: nothing to gain from remembering results
+    remember_results = False
+
+    _TOKEN = re.compile(r"[^\W\d_][\w'-]*|\S+")
+
+    def __init__(self, lexicon: Dict[str, str] = None, fuzzy_cutoff: float = None):
+        self.lexicon = dict(GROCERY_LEXICON if lexicon is None else lexicon)
+        if lexicon is None and settings.TRANSLATION_LEXICON_PATH:
+            with open(settings.TRANSLATION_LEXICON_PATH, encoding='utf-8') as f:
+                self.lexicon.update({k.casefold(): v for k, v in json.load(f).items()})
+        self.fuzzy_cutoff = fuzzy_cutoff or settings.TRANSLATION_FUZZY_CUTOFF
+        self.max_phrase_words = max(len(key.split()) for key in self.lexicon) if self.lexicon else 1
+        # Fuzzy candidates bucketed by first letter keeps difflib fast
+        self._buckets = {}
+        for key in self.lexicon:
+            self._buckets.setdefault(key[0], []).append(key)
+        self.lookup = lru_cache(maxsize=settings.TRANSLATION_MEMORY_CACHE_SIZE)(self.lookup)
+
+    async def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        return self.lookup(text)
+
+    def lookup(self, text: str) -> str:
+        """Translate a name using the lexicon; text that is not matched is kept verbatim"""
+        tokens = list(self._TOKEN.finditer(text))
+        if not tokens:
+            return text
+        keys = [token.group().casefold() for token in tokens]
+
+        # Translations replace the spans of the words they match, so the
+        # punctuation and spacing around unmatched text survive as-is
+        parts = []
+        end = 0
+        i = 0
+        while i < len(tokens):
+            # Longest multi-word lexicon entry starting at this word wins
+            for size in range(min(self.max_phrase_words, len(tokens) - i), 0, -1):
+                phrase = ' '.join(keys[i:i + size])
+                if phrase in self.lexicon:
+                    translation = self.lexicon[phrase]
+                    break
+            else:
+                size = 1
+                translation = self._lookup_word(keys[i])
+            if translation is not None:
+                parts.append(text[end:tokens[i].start()])
+                parts.append(translation)
+                end = tokens[i + size - 1].end()
+            i += size
+        parts.append(text[end:])
+        return ''.join(parts).strip()
+
+    def _lookup_word(self, word: str) -> Optional[str]:
+        """Translate one lowercase word that has no exact lexicon entry"""
+        if len(word) < 3 or not word[0].isalpha():
+            return None
+
+        match = difflib.get_close_matches(word, self._buckets.get(word[0], ()), n=1, cutoff=self.fuzzy_cutoff)
+        if match:
+            return self.lexicon[match[0]]
+
+        # Dutch compounds put the head noun last
+        for start in range(1, len(word) - 2):
+            if word[start:] in self.lexicon:
+                return self.lexicon[word[start:]]
+        return None
+
+
+def create_backend(name: str = None) -> TranslationBackend:
+    """Build the translation backend selected in settings (or by name)"""
+    name = (name or settings.TRANSLATION_BACKEND).lower()
+    if name == 'google':
+        return GoogleTranslateBackend()
+    if name == 'offline':
+        return OfflineGlossaryBackend()
+    raise ValueError(f"Unknown translation backend: {name}")
+
+
+class TranslationService:
+    """Handles translation operations"""
+
+    def __init__(self, memory: Optional[TranslationMemory] = None,
+                 backend: Optional[TranslationBackend] = None):
+        self.backend = backend or create_backend()
+        if memory is None and settings.TRANSLATION_MEMORY_ENABLED:
+            memory = TranslationMemory()
+        self.memory = memory
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
     def translate_items(self, items: List[Dict]) -> List[Dict]:
         """Translate Dutch item names to English"""
-        try:
-            for item in items:
-                if item['dutch_name'] and not item['english_name']:
-                    translated = self.translator.translate(item['dutch_name'], src='nl', dest='en')
-                    item['english_name'] = translated.text
-        except Exception as e:
-            print(f"Translation error: {e}")
+        # Backends are async; synchronous callers (GUI, CLI) share one
+        # background loop so e.g. googletrans' HTTP client stays on one loop
+        future = asyncio.run_coroutine_threadsafe(self.translate_items_async(items), self._get_loop())
+        return future.result()
+
+    async def translate_items_async(self, items: List[Dict], concurrency: int = None,
+                                    timeout: float = None) -> List[Dict]:
+        """Translate Dutch item names to English, deduplicated and concurrently
+
+        Each distinct name is translated once; items whose translation fails
+        or times out keep their Dutch name without affecting the rest.
+        """
+        with metrics.stage('translate'):
+            return await self._translate_items(items, concurrency, timeout)
+
+    async def _translate_items(self, items: List[Dict], concurrency: int = None,
+                               timeout: float = None) -> List[Dict]:
+        """Memory lookup, backend translation and write-back behind translate_items_async"""
+        pending = [item for item in items if item['dutch_name'] and not item['english_name']]
+
+        # Names seen before are answered from the translation memory; it is
+        # SQLite, so reads and writes run in a thread to keep the loop free
+        if self.memory and pending:
+            known = await asyncio.to_thread(self.memory.get_many, [item['dutch_name'] for item in pending])
+            for item in pending:
+                if item['dutch_name'] in known:
+                    item['english_name'] = known[item['dutch_name']]
+            pending = [item for item in pending if not item['english_name']]
+
+        names = list(dict.fromkeys(item['dutch_name'] for item in pending))
+        translations = await self.translate_names(names, concurrency, timeout) if names else {}
+
+        for item in pending:
             # If translation fails, copy dutch name
-            for item in items:
-                if not item['english_name']:
-                    item['english_name'] = item['dutch_name']
-        
+            item['english_name'] = translations.get(item['dutch_name']) or item['dutch_name']
+
+        if self.memory and translations and self.backend.remember_results:
+            await asyncio.to_thread(self.memory.put_many, list(translations.items()))
+
         return items
-    
+
+    async def translate_names(self, names: List[str], concurrency: int = None,
+                              timeout: float = None) -> Dict[str, str]:
+        """Translate distinct names; returns {name: translation} for the ones that succeeded"""
+        concurrency = concurrency or settings.TRANSLATION_CONCURRENCY
+        timeout = timeout or settings.TRANSLATION_TIMEOUT
+        translations = {}
+
+        # One request for the whole receipt: Google keeps line breaks intact
+        if settings.TRANSLATION_BULK and self.backend.supports_bulk and len(names) > 1:
+            try:
+                text = await asyncio.wait_for(self._translate('\n'.join(names)), timeout * 2)
+                lines = text.split('\n')
+                if len(lines) == len(names):
+                    return {name: line.strip() for name, line in zip(names, lines) if line.strip()}
+            except Exception as e:
+                metrics.STAGE_ERRORS.inc(stage='translate')
+                print(f"Bulk translation error, retrying per item: {e!r}")
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def translate_one(name: str):
+            async with semaphore:
+                try:
+                    translations[name] = await asyncio.wait_for(self._translate(name), timeout)
+                except Exception as e:
+                    metrics.STAGE_ERRORS.inc(stage='translate')
+                    print(f"Translation error for '{name}': {e!r}")
+
+        await asyncio.gather(*(translate_one(name) for name in names))
+        return translations
+
     async def translate_text(self, text: str, src_lang: str = 'nl', dest_lang: str = 'en') -> str:
         """Translate single text"""
         try:
-            result = await self.translator.translate(text, src=src_lang, dest=dest_lang)
-            return result.text
+            return await self._translate(text, src_lang, dest_lang)
         except Exception as e:
             print(f"Translation error: {e}")
             return text
 
+    async def warm_up(self):
+        """Translate a sample name so the backend's connection is open before real requests"""
+        try:
+            await asyncio.wait_for(self._translate('melk'), settings.TRANSLATION_TIMEOUT)
+        except Exception as e:
+            print(f"Translation warm-up failed: {e!r}")
+
+    async def close(self):
+        """Close the backend's connections and the translation memory"""
+        await self.backend.close()
+        if self.memory:
+            self.memory.close()
+
+    async def _translate(self, text: str, src_lang: str = None, dest_lang: str = None) -> str:
+        """Translate with the configured backend"""
+        return await self.backend.translate(
+            text, src_lang or settings.DEFAULT_SOURCE_LANG, dest_lang or settings.DEFAULT_TARGET_LANG
+        )
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop (on a daemon thread) used by the synchronous API"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+            return self._loop
@@ -0,0 +1,60 @@
+# utils/helpers.py
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe in-process least-recently-used cache"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        """Return the cached value and mark it as recently used"""
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def image_hash(data: bytes) -> str:
+    """Content hash identifying a receipt image"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    """zlib-compress text for storage (None stays None)"""
+    return zlib.compress(text.encode('utf-8')) if text is not None else None
+
+
+def decompress_text(data: Optional[bytes]) -> Optional[str]:
+    """Inverse of compress_text"""
+    return zlib.decompress(data).decode('utf-8') if data is not None else None
@@ -1,66 +1,363 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
 
 from pydantic import BaseModel
 from dotenv import load_dotenv
+import asyncio
+import io
+import json
+import multiprocessing
 import os
-from image_processor import ImageProcessor
+import zipfile
+from typing import Dict, List, Optional, Tuple
+import metrics
+from config import settings
+from image_processor import available_profiles
+from job_queue import JobQueue, run_job_worker
+from pipeline import EXTRACTION_MODES, OCRWorkerPool, PipelineBusyError, process_image_bytes
+from result_cache import ResultCache
 from translator import TranslationService
-import tempfile
-from pathlib import Path
 load_dotenv()
 
-app = FastAPI()
+ocr_pool = OCRWorkerPool()
+result_cache = ResultCache()
+# Created in lifespan so each server worker owns one (and its HTTP connections)
+translator: Optional[TranslationService] = None
+# Created in lifespan too, so importing the app does not create jobs.db
+job_queue: Optional[JobQueue] = None
+
+
+def cache_stats() -> Dict[Tuple[str, str], float]:
+    """Hit/miss counts of the OCR result cache and the translation memory"""
+    stats = {'result': result_cache.stats()}
+    if translator is not None and translator.memory:
+        stats['translation'] = translator.memory.stats()
+    return {(cache, outcome): counts[key] for cache, counts in stats.items()
+            for outcome, key in (('hit', 'hits'), ('miss', 'misses'))}
+
+
+metrics.REGISTRY.callback(
+    'receipt_cache_requests_total', 'Cache lookups by cache and outcome', 'counter', cache_stats, ('cache', 'result')
+)
+def queue_depth() -> Dict[Tuple[str], float]:
+    """Images waiting or in progress in the OCR pool and the job queue"""
+    depth = {('ocr_pool',): ocr_pool.pending}
+    if job_queue is not None:
+        depth[('jobs',)] = job_queue.pending_count()
+    return depth
+
+
+metrics.REGISTRY.callback(
+    'receipt_queue_depth', 'Images waiting or in progress', 'gauge', queue_depth, ('queue',)
+)
+
+
+def start_job_workers() -> Tuple[list, object]:
+    """Spawn the processes that drain the batch job queue"""
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    workers = [
+        context.Process(target=run_job_worker, args=(job_queue.db_path, stop_event), daemon=True)
+        for _ in range(settings.JOB_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers, stop_event
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global translator, job_queue
+    translator = TranslationService()
+    job_queue = JobQueue()
+    # Requests are accepted only once the OCR workers and the translator are warm
+    await asyncio.gather(ocr_pool.warm_up(), translator.warm_up())
+    job_queue.purge()
+    job_workers, stop_job_workers = start_job_workers()
+    try:
+        yield
+    finally:
+        stop_job_workers.set()
+        for worker in job_workers:
+            worker.join(timeout=30)
+        ocr_pool.shutdown()
+        await translator.close()
+        result_cache.close()
+        job_queue.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 MAX_BYTES = 10 * 1024 * 1024  # 10MB
 CHUNK_SIZE = 1024 * 1024      # 1MB
 ALLOWED_CT = {"image/jpeg", "image/png", "image/webp"}
+ZIP_CT = {"application/zip", "application/x-zip-compressed"}
+
 
-TMP_DIR = Path("/tmp/myapp_uploads")
-TMP_DIR.mkdir(parents=True, exist_ok=True)
+def check_options(profile: Optional[str], extraction: Optional[str]) -> Tuple[str, str]:
+    """Resolve the profile/extraction query parameters, rejecting unknown values"""
+    # Preprocessing profile: fast, balanced, quality or auto (settings default)
+    profile = profile or settings.PREPROCESS_PROFILE
+    if profile not in available_profiles():
+        raise HTTPException(422, f"Unknown profile; expected one of: {', '.join(available_profiles())}")
+
+    # Item extraction: regex over the text, or word boxes with per-item confidence
+    extraction = extraction or settings.ITEM_EXTRACTION
+    if extraction not in EXTRACTION_MODES:
+        raise HTTPException(422, f"Unknown extraction; expected one of: {', '.join(EXTRACTION_MODES)}")
+    return profile, extraction
 
- 
 
 @app.post("/v1/extract-items")
-async def add(file: UploadFile = File(...)):
+async def add(file: UploadFile = File(...), profile: Optional[str] = None, extraction: Optional[str] = None):
     if file.content_type not in ALLOWED_CT:
         raise HTTPException(415, "Unsupported content type")
 
-    suffix = {
-        "image/jpeg": ".jpg",
-        "image/png": ".png",
-        "image/webp": ".webp",
-    }[file.content_type]
+    profile, extraction = check_options(profile, extraction)
 
-    tmp_path = None
+    # Read file (limit size); the upload is decoded in memory, never written to disk
+    data = await file.read(MAX_BYTES + 1)
+    if len(data) > MAX_BYTES:
+        raise HTTPException(413, "File too large")
 
     try:
-        # Create temp file
-        fd, name = tempfile.mkstemp(dir=str(TMP_DIR), suffix=suffix)
-        os.close(fd)
-        tmp_path = name
+        result, cached = await extract(data, profile, extraction)
+    except PipelineBusyError as e:
+        raise HTTPException(
+            503, str(e), headers={"Retry-After": str(settings.OCR_RETRY_AFTER)}
+        )
+    except ValueError as e:
+        # The upload is not a decodable image despite its content type
+        raise HTTPException(422, str(e))
+
+    extracted_items = await translator.translate_items_async(result['items'])
+    return {"ok": True, **summarize(result, extracted_items, cached, profile, extraction)}
+
+
+async def extract(data: bytes, profile: str, extraction: str) -> Tuple[Dict, bool]:
+    """OCR + item extraction for one image, served from the result cache when possible"""
+    # Identical uploads (retries, duplicates) skip OCR entirely
+    cache_key = await run_in_threadpool(ResultCache.make_key, data, profile, extraction)
+    # The on-disk tier (RESULT_CACHE_DB) is SQLite, so lookups stay off the event loop
+    result = await run_in_threadpool(result_cache.get, cache_key)
+    cached = result is not None
+
+    if not cached:
+        # OCR + parsing run in the worker pool so the event loop stays free
+        try:
+            result = await ocr_pool.submit(process_image_bytes, data, profile, extraction)
+        except PipelineBusyError:
+            metrics.STAGE_ERRORS.inc(stage='queue')
+            raise
+        except ValueError:
+            # The client's upload is not an image; not a pipeline failure
+            metrics.STAGE_ERRORS.inc(stage='decode')
+            raise
+        except Exception:
+            metrics.STAGE_ERRORS.inc(stage='pipeline')
+            raise
+        # The stages ran in a pool worker; record them in this process
+        metrics.observe(result.pop('timings', {}))
+        await run_in_threadpool(result_cache.put, cache_key, result)
+
+    metrics.ITEMS_PER_RECEIPT.observe(len(result['items']))
+    return result, cached
+
+
+def summarize(result: Dict, items: List[Dict], cached: bool, profile: str, extraction: str) -> Dict:
+    """Response fields for one extracted receipt"""
+    return {
+        "items": items,
+        "cached": cached,
+        "profile": result.get('profile', profile),
+        "ocr_confidence": result.get('confidence'),
+        "crop_ratio": result.get('crop_ratio'),
+        "needs_review": needs_review(result, items, extraction),
+    }
+
 
-        # Read file (limit size)
+def needs_review(result: Dict, items: List[Dict], extraction: str) -> bool:
+    """Whether a receipt must be checked by a person before it is accepted"""
+    # Only word-level extraction can tell; text extraction never auto-accepts
+    if extraction != 'words':
+        return True
+    # No items usually means no price column was found (blurry or partial photo)
+    if not items or (result.get('confidence') or 0.0) < settings.RECEIPT_REVIEW_CONFIDENCE:
+        return True
+    return any(item.get('needs_review') for item in items)
+
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def encode_event(event: Dict, stream_format: str) -> str:
+    """One event as an NDJSON line or a Server-Sent Event"""
+    if stream_format == "sse":
+        return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+
+@app.post("/v1/extract-items/stream")
+async def extract_items_stream(files: List[UploadFile] = File(...), profile: Optional[str] = None,
+                               extraction: Optional[str] = None,
+                               stream_format: str = Query("ndjson", alias="format"),
+                               stages: bool = False):
+    """Extract items from several receipts, streaming each result as soon as it is ready
+
+    Every receipt produces a ``result`` (or ``error``) event carrying its
+    ``index`` in the upload; with ``stages=true`` it is preceded by ``ocr``
+    (text recognized and items parsed) and ``translated`` events. A final
+    ``done`` event closes the stream.
+    """
+    if stream_format not in STREAM_FORMATS:
+        raise HTTPException(422, f"Unknown format; expected one of: {', '.join(STREAM_FORMATS)}")
+    if len(files) > settings.STREAM_MAX_IMAGES:
+        raise HTTPException(413, f"At most {settings.STREAM_MAX_IMAGES} images per request")
+    profile, extraction = check_options(profile, extraction)
+
+    # Validate every upload before streaming starts, so these still fail with a status code
+    uploads = []
+    for file in files:
+        if file.content_type not in ALLOWED_CT:
+            raise HTTPException(415, f"Unsupported content type: {file.content_type}")
         data = await file.read(MAX_BYTES + 1)
         if len(data) > MAX_BYTES:
-            raise HTTPException(413, "File too large")
+            raise HTTPException(413, f"{file.filename} is too large")
+        uploads.append((file.filename, data))
 
-        # Write to disk (sync is fine here)
-        with open(tmp_path, "wb") as f:
-            f.write(data)
+    events = asyncio.Queue()
+    # One request may not take more than the pool's workers, leaving room for others
+    slots = asyncio.Semaphore(ocr_pool.max_workers)
 
-        # --- Your existing logic ---
-        image_processor = ImageProcessor()
-        translator = TranslationService()
+    async def process(index: int, filename: str, data: bytes):
+        base = {"index": index, "filename": filename}
+        try:
+            async with slots:
+                result, cached = await extract(data, profile, extraction)
+            if stages:
+                await events.put({"event": "ocr", **base, "cached": cached,
+                                  "ocr_confidence": result.get('confidence'), "items": len(result['items'])})
 
-        text = image_processor.extract_text_from_image(tmp_path)
-        extracted_items = image_processor.extract_items_from_text(text)
-        extracted_items = translator.translate_items(extracted_items)
+            items = await translator.translate_items_async(result['items'])
+            if stages:
+                await events.put({"event": "translated", **base})
+            await events.put({"event": "result", **base, **summarize(result, items, cached, profile, extraction)})
+        except PipelineBusyError as e:
+            await events.put({"event": "error", **base, "error": str(e), "retry_after": settings.OCR_RETRY_AFTER})
+        except Exception as e:
+            await events.put({"event": "error", **base, "error": str(e)})
 
-        return {"ok": True, "items": extracted_items}
+    async def stream():
+        tasks = [asyncio.create_task(process(index, *upload)) for index, upload in enumerate(uploads)]
+        failed = 0
+        try:
+            finished = 0
+            while finished < len(tasks):
+                event = await events.get()
+                if event["event"] in ("result", "error"):
+                    finished += 1
+                    failed += event["event"] == "error"
+                yield encode_event(event, stream_format)
+            yield encode_event({"event": "done", "total": len(tasks), "failed": failed}, stream_format)
+        finally:
+            # The client went away mid-stream: stop work nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        stream(), media_type=STREAM_FORMATS[stream_format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def unpack_zip(fileobj, budget: int) -> List[Tuple[str, bytes]]:
+    """Image members of a zip archive as (name, bytes), in archive order
+
+    Members are read one at a time from the (spooled) upload; each is
+    capped at MAX_BYTES and together they may not exceed budget bytes.
+    """
+    extensions = tuple(pattern.lstrip('*') for pattern in settings.SUPPORTED_FORMATS) + ('.webp',)
+    images = []
+    try:
+        with zipfile.ZipFile(fileobj) as archive:
+            for member in archive.infolist():
+                name = member.filename
+                if member.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith(extensions):
+                    continue
+                if len(images) >= settings.JOB_MAX_IMAGES:
+                    raise HTTPException(413, f"At most {settings.JOB_MAX_IMAGES} images per job")
+                # Header sizes can lie, so the read itself is bounded as well
+                with archive.open(member) as f:
+                    data = f.read(MAX_BYTES + 1)
+                if len(data) > MAX_BYTES:
+                    raise HTTPException(413, f"{name} is too large")
+                budget -= len(data)
+                if budget < 0:
+                    raise HTTPException(413, f"At most {settings.JOB_MAX_BYTES} image bytes per job")
+                images.append((name, data))
+    except zipfile.BadZipFile:
+        raise HTTPException(422, "Invalid zip archive")
+    return images
+
+
+@app.post("/v1/jobs", status_code=202)
+async def create_job(files: List[UploadFile] = File(...), profile: Optional[str] = None,
+                     extraction: Optional[str] = None):
+    """Queue many receipt images (and/or zip archives of them) for background processing"""
+    profile, extraction = check_options(profile, extraction)
+
+    images = []
+    budget = settings.JOB_MAX_BYTES
+    for file in files:
+        is_zip = file.content_type in ZIP_CT or (file.filename or '').lower().endswith('.zip')
+        if not is_zip and file.content_type not in ALLOWED_CT:
+            raise HTTPException(415, f"Unsupported content type: {file.content_type}")
+
+        if is_zip:
+            # The upload is already spooled to a temporary file; unpack from there
+            # instead of holding the archive and its members in memory together
+            size = await run_in_threadpool(file.file.seek, 0, io.SEEK_END)
+            if size > settings.JOB_MAX_BYTES:
+                raise HTTPException(413, f"{file.filename} is too large")
+            await run_in_threadpool(file.file.seek, 0)
+            unpacked = await run_in_threadpool(unpack_zip, file.file, budget)
+            budget -= sum(len(data) for _, data in unpacked)
+            images += unpacked
+        else:
+            data = await file.read(MAX_BYTES + 1)
+            if len(data) > MAX_BYTES:
+                raise HTTPException(413, f"{file.filename} is too large")
+            budget -= len(data)
+            images.append((file.filename, data))
+        if budget < 0:
+            raise HTTPException(413, f"At most {settings.JOB_MAX_BYTES} image bytes per job")
+        if len(images) > settings.JOB_MAX_IMAGES:
+            raise HTTPException(413, f"At most {settings.JOB_MAX_IMAGES} images per job")
+
+    if not images:
+        raise HTTPException(422, "No images found in the upload")
+
+    job_id = await run_in_threadpool(job_queue.submit, images, profile, extraction)
+    return {"ok": True, "job_id": job_id, "status": "queued", "images": len(images),
+            "status_url": f"/v1/jobs/{job_id}"}
+
+
+@app.get("/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Progress of a batch job and the results of the images finished so far"""
+    job = await run_in_threadpool(job_queue.get_job, job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    return {"ok": True, **job}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint: stage latencies, cache hit rates, queue depth, errors"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)    
 
 @app.get("/config-example")
 def config_example():